@@ -0,0 +1,271 @@
+import os
+import pickle
+import sqlite3
+import threading
+import time
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+SCHEMA = (
+    'CREATE TABLE IF NOT EXISTS cache ('
+    'key TEXT PRIMARY KEY, value BLOB NOT NULL, '
+    'expires REAL, accessed REAL NOT NULL)',
+    'CREATE INDEX IF NOT EXISTS cache_accessed ON cache (accessed)',
+    'CREATE INDEX IF NOT EXISTS cache_expires ON cache (expires)',
+)
+# Время обращения обновляется не чаще раза в секунду:
+# частые чтения одного ключа не превращаются в запись.
+ACCESS_RESOLUTION = 1.0
+LIVE = '(expires IS NULL OR expires > ?)'
+MAX_VARIABLES = 500
+UPSERT = (
+    'INSERT INTO cache VALUES (?, ?, ?, ?) ON CONFLICT (key) DO UPDATE SET '
+    'value = excluded.value, expires = excluded.expires, '
+    'accessed = excluded.accessed'
+)
+
+
+class SQLiteCache(BaseCache):
+    """Кеш в файле SQLite, общий для всех процессов одного хоста.
+
+    В отличие от LocMemCache, воркеры gunicorn/uwsgi видят одни и те же
+    записи и сбросы. Журнал WAL позволяет читать параллельно с записью,
+    при переполнении вытесняются давно не читанные ключи (LRU).
+
+    LOCATION — путь к файлу базы.
+    """
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        self._path = location
+        self._local = threading.local()
+
+    @property
+    def _connection(self):
+        local = self._local
+        if getattr(local, 'pid', None) != os.getpid():
+            connection = sqlite3.connect(self._path, timeout=30,
+                                         isolation_level=None)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            for statement in SCHEMA:
+                connection.execute(statement)
+            local.connection = connection
+            local.pid = os.getpid()
+        return local.connection
+
+    def _write(self, statements):
+        """Выполняет запросы в одной транзакции BEGIN IMMEDIATE."""
+        connection = self._connection
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            result = statements(connection)
+        except BaseException:
+            connection.execute('ROLLBACK')
+            raise
+        connection.execute('COMMIT')
+        return result
+
+    def _expires(self, timeout):
+        return self.get_backend_timeout(timeout)
+
+    def _fetch(self, keys):
+        now = time.time()
+        rows = []
+        for start in range(0, len(keys), MAX_VARIABLES):
+            chunk = keys[start:start + MAX_VARIABLES]
+            placeholders = ', '.join('?' * len(chunk))
+            rows += self._connection.execute(
+                f'SELECT key, value, accessed FROM cache '
+                f'WHERE key IN ({placeholders}) AND {LIVE}',
+                [*chunk, now],
+            ).fetchall()
+        stale = [key for key, _, accessed in rows
+                 if now - accessed > ACCESS_RESOLUTION]
+        if stale:
+            self._write(lambda connection: connection.executemany(
+                'UPDATE cache SET accessed = ? WHERE key = ?',
+                [(now, key) for key in stale]))
+        return {key: pickle.loads(value) for key, value, _ in rows}
+
+    def _cull(self, connection):
+        now = time.time()
+        connection.execute('DELETE FROM cache WHERE expires <= ?', [now])
+        count = connection.execute('SELECT COUNT(*) FROM cache').fetchone()[0]
+        if count < self._max_entries:
+            return
+        if self._cull_frequency == 0:
+            connection.execute('DELETE FROM cache')
+            return
+        connection.execute(
+            'DELETE FROM cache WHERE key IN (SELECT key FROM cache '
+            'ORDER BY accessed LIMIT ?)', [count // self._cull_frequency])
+
+    def _store(self, items, timeout, mode='set'):
+        expires = self._expires(timeout)
+        now = time.time()
+        rows = [(key, pickle.dumps(value, pickle.HIGHEST_PROTOCOL),
+                 expires, now) for key, value in items]
+
+        def statements(connection):
+            self._cull(connection)
+            if mode == 'add':
+                connection.execute(
+                    f'DELETE FROM cache WHERE key = ? AND NOT {LIVE}',
+                    [rows[0][0], now])
+                cursor = connection.execute(
+                    'INSERT OR IGNORE INTO cache VALUES (?, ?, ?, ?)',
+                    rows[0])
+                return cursor.rowcount == 1
+            connection.executemany(UPSERT, rows)
+            return True
+        return self._write(statements)
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        return self._store([(key, value)], timeout, mode='add')
+
+    def get(self, key, default=None, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        return self._fetch([key]).get(key, default)
+
+    def get_many(self, keys, version=None):
+        if not keys:
+            return {}
+        keys = {self.make_key(key, version=version): key for key in keys}
+        for key in keys:
+            self.validate_key(key)
+        return {keys[key]: value
+                for key, value in self._fetch(list(keys)).items()}
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        self._store([(key, value)], timeout)
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        items = []
+        for key, value in data.items():
+            key = self.make_key(key, version=version)
+            self.validate_key(key)
+            items.append((key, value))
+        if items:
+            self._store(items, timeout)
+        return []
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        return self._write(lambda connection: connection.execute(
+            f'UPDATE cache SET expires = ? WHERE key = ? AND {LIVE}',
+            [self._expires(timeout), key, time.time()]).rowcount == 1)
+
+    def incr(self, key, delta=1, version=None):
+        """Атомарное увеличение: чтение и запись в одной транзакции."""
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+
+        def statements(connection):
+            row = connection.execute(
+                f'SELECT value FROM cache WHERE key = ? AND {LIVE}',
+                [key, time.time()]).fetchone()
+            if row is None:
+                raise ValueError(f"Key '{key}' not found")
+            value = pickle.loads(row[0]) + delta
+            connection.execute(
+                'UPDATE cache SET value = ? WHERE key = ?',
+                [pickle.dumps(value, pickle.HIGHEST_PROTOCOL), key])
+            return value
+        return self._write(statements)
+
+    def _select(self, connection, keys, now):
+        """{ключ: сырое значение} живых ключей, запросами по MAX_VARIABLES."""
+        current = {}
+        for start in range(0, len(keys), MAX_VARIABLES):
+            chunk = keys[start:start + MAX_VARIABLES]
+            placeholders = ', '.join('?' * len(chunk))
+            current.update(connection.execute(
+                f'SELECT key, value FROM cache '
+                f'WHERE key IN ({placeholders}) AND {LIVE}',
+                [*chunk, now]).fetchall())
+        return current
+
+    def incr_many(self, deltas, version=None):
+        """Увеличивает несколько счётчиков одной транзакцией.
+
+        В отличие от incr, отсутствующий ключ создаётся бессрочным со
+        значением delta. Возвращает {ключ: новое значение}.
+        """
+        keys = {self.make_key(key, version=version): key for key in deltas}
+        for key in keys:
+            self.validate_key(key)
+
+        def statements(connection):
+            self._cull(connection)
+            now = time.time()
+            current = self._select(connection, list(keys), now)
+            values = {
+                key: (pickle.loads(current[key]) if key in current else 0)
+                + deltas[name]
+                for key, name in keys.items()
+            }
+            connection.executemany(UPSERT, [
+                (key, pickle.dumps(value, pickle.HIGHEST_PROTOCOL), None, now)
+                for key, value in values.items()
+            ])
+            return {keys[key]: value for key, value in values.items()}
+        if not keys:
+            return {}
+        return self._write(statements)
+
+    def update_many(self, keys, update, version=None):
+        """Заменяет значения ключей на update(значение) одной транзакцией.
+
+        Чтение и запись идут под BEGIN IMMEDIATE, поэтому параллельные
+        обновления из разных процессов не затирают друг друга.
+        Отсутствующие ключи пропускаются, срок жизни не меняется.
+        Возвращает список обновлённых ключей.
+        """
+        keys = {self.make_key(key, version=version): key for key in keys}
+        for key in keys:
+            self.validate_key(key)
+
+        def statements(connection):
+            current = self._select(connection, list(keys), time.time())
+            connection.executemany(
+                'UPDATE cache SET value = ? WHERE key = ?',
+                [(pickle.dumps(update(pickle.loads(value)),
+                               pickle.HIGHEST_PROTOCOL), key)
+                 for key, value in current.items()])
+            return [keys[key] for key in current]
+        if not keys:
+            return []
+        return self._write(statements)
+
+    def delete(self, key, version=None):
+        self.delete_many([key], version=version)
+
+    def delete_many(self, keys, version=None):
+        keys = [self.make_key(key, version=version) for key in keys]
+        for key in keys:
+            self.validate_key(key)
+        if keys:
+            self._write(lambda connection: connection.executemany(
+                'DELETE FROM cache WHERE key = ?', [(key,) for key in keys]))
+
+    def has_key(self, key, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        return self._connection.execute(
+            f'SELECT 1 FROM cache WHERE key = ? AND {LIVE}',
+            [key, time.time()]).fetchone() is not None
+
+    def clear(self):
+        self._write(lambda connection: connection.execute(
+            'DELETE FROM cache'))
+
+    def close(self, **kwargs):
+        # Соединение живёт весь поток: файл открывается один раз.
+        pass
@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand
+
+from core import tasks
+
+ROW = '{:<45} {:<8} {:>7} {:>9} {:>9}'
+
+
+class Command(BaseCommand):
+    help = ('Выполняет фоновые задачи из очереди, показывает их метрики '
+            'или удаляет старые.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--burst', action='store_true',
+                            help='Выйти, когда очередь опустеет.')
+        parser.add_argument('--sleep', type=float, default=1.0,
+                            help='Пауза при пустой очереди, с.')
+        parser.add_argument('--limit', type=int,
+                            help='Выполнить не больше стольких задач.')
+        parser.add_argument('--stats', action='store_true',
+                            help='Показать метрики задач и выйти.')
+        parser.add_argument('--prune', type=int, metavar='DAYS',
+                            help='Удалить выполненные задачи старше '
+                                 'DAYS дней и выйти.')
+
+    def handle(self, *args, **options):
+        if options['prune'] is not None:
+            deleted = tasks.prune(options['prune'])
+            self.stdout.write(self.style.SUCCESS(
+                f'Удалено задач: {deleted}'))
+            return
+        if options['stats']:
+            self.stdout.write(ROW.format(
+                'task', 'status', 'count', 'avg, мс', 'max, мс'))
+            for row in tasks.stats():
+                self.stdout.write(ROW.format(
+                    row['name'], row['status'], row['count'],
+                    round((row['avg'] or 0) * 1000, 1),
+                    round((row['max'] or 0) * 1000, 1)))
+            return
+        done = tasks.work(burst=options['burst'], sleep=options['sleep'],
+                          limit=options['limit'])
+        self.stdout.write(self.style.SUCCESS(f'Выполнено задач: {done}'))
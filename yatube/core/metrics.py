@@ -0,0 +1,207 @@
+import threading
+import time
+from bisect import bisect_left
+from collections import defaultdict
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.cache import cache
+from django.template.backends.django import DjangoTemplates, Template
+
+# Верхние границы корзин гистограмм, секунды.
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+METRICS = ('total', 'sql', 'template', 'thumbnail', 'image')
+KEY_PREFIX = 'metrics'
+ROUTES_KEY = f'{KEY_PREFIX}:routes'
+# Суммы хранятся в микросекундах: incr работает с целыми числами.
+MICROSECONDS = 1_000_000
+
+_local = threading.local()
+
+
+class Timings:
+    """Время и число операций каждого вида за один запрос."""
+
+    def __init__(self):
+        self.seconds = defaultdict(float)
+        self.counts = defaultdict(int)
+        # Глубина вложенных блоков timed по метрике.
+        self.depth = defaultdict(int)
+
+    def add(self, metric, seconds):
+        self.seconds[metric] += seconds
+        self.counts[metric] += 1
+
+    def header(self):
+        """Значение заголовка Server-Timing, длительности в миллисекундах."""
+        parts = []
+        for metric in METRICS:
+            if metric not in self.seconds:
+                continue
+            part = f'{metric};dur={self.seconds[metric] * 1000:.1f}'
+            if metric != 'total':
+                part += f';desc="{self.counts[metric]}"'
+            parts.append(part)
+        return ', '.join(parts)
+
+
+@contextmanager
+def collect():
+    """Включает сбор Timings для текущего потока."""
+    _local.timings = timings = Timings()
+    try:
+        yield timings
+    finally:
+        _local.timings = None
+
+
+@contextmanager
+def timed(metric):
+    """Добавляет длительность блока к метрике текущего запроса.
+
+    Вложенные блоки той же метрики (карточки, отрендеренные внутри
+    шаблона страницы) входят во внешний и отдельно не считаются.
+    """
+    timings = getattr(_local, 'timings', None)
+    if timings is None:
+        yield
+        return
+    timings.depth[metric] += 1
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.depth[metric] -= 1
+        if not timings.depth[metric]:
+            timings.add(metric, time.perf_counter() - started)
+
+
+def time_query(execute, sql, params, many, context):
+    """Обёртка execute_wrapper для метрики sql."""
+    with timed('sql'):
+        return execute(sql, params, many, context)
+
+
+class TimedTemplate(Template):
+    def render(self, context=None, request=None):
+        with timed('template'):
+            return super().render(context, request)
+
+
+class TimedTemplates(DjangoTemplates):
+    """Бэкенд DjangoTemplates, замеряющий рендеринг для метрики template.
+
+    Вложенные {% include %} рендерятся внутри шаблона верхнего уровня
+    и отдельно не считаются.
+    """
+
+    def from_string(self, template_code):
+        return TimedTemplate(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        template = super().get_template(template_name)
+        return TimedTemplate(template.template, self)
+
+
+def key(route, metric, name):
+    return f'{KEY_PREFIX}:{route}:{metric}:{name}'
+
+
+class Histograms:
+    """Гистограммы процесса, которые периодически сливаются в кеш.
+
+    Кеш по умолчанию общий для воркеров (core.cache.SQLiteCache), поэтому
+    счётчики в нём — сумма по всем процессам. Сброс раз в
+    METRICS_FLUSH_INTERVAL секунд избавляет запрос от записи в кеш, а
+    incr_many записывает все счётчики одной транзакцией.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.pending = defaultdict(int)
+        self.routes = set()
+        self.flushed = time.monotonic()
+
+    def observe(self, route, timings):
+        with self.lock:
+            self.routes.add(route)
+            for metric, seconds in timings.seconds.items():
+                bucket = bisect_left(BUCKETS, seconds)
+                self.pending[key(route, metric, bucket)] += 1
+                self.pending[key(route, metric, 'sum')] += round(
+                    seconds * MICROSECONDS)
+                self.pending[key(route, metric, 'count')] += 1
+        if time.monotonic() - self.flushed >= settings.METRICS_FLUSH_INTERVAL:
+            self.flush()
+
+    def flush(self):
+        with self.lock:
+            pending, self.pending = self.pending, defaultdict(int)
+            routes = set(self.routes)
+            self.flushed = time.monotonic()
+        known = cache.get(ROUTES_KEY, set())
+        if not routes <= known:
+            cache.set(ROUTES_KEY, known | routes, None)
+        incr_many = getattr(cache, 'incr_many', None)
+        if incr_many is not None:
+            incr_many(pending)
+            return
+        for name, delta in pending.items():
+            try:
+                cache.incr(name, delta)
+            except ValueError:
+                if not cache.add(name, delta, None):
+                    cache.incr(name, delta)
+
+    def read(self):
+        """Счётчики всех процессов: {маршрут: {метрика: значения}}."""
+        self.flush()
+        routes = sorted(cache.get(ROUTES_KEY, set()))
+        names = [
+            key(route, metric, name)
+            for route in routes
+            for metric in METRICS
+            for name in [*range(len(BUCKETS) + 1), 'sum', 'count']
+        ]
+        values = cache.get_many(names)
+        return {
+            route: {
+                metric: {
+                    'buckets': [values.get(key(route, metric, bucket), 0)
+                                for bucket in range(len(BUCKETS) + 1)],
+                    'sum': values.get(key(route, metric, 'sum'), 0),
+                    'count': values.get(key(route, metric, 'count'), 0),
+                }
+                for metric in METRICS
+            }
+            for route in routes
+        }
+
+
+histograms = Histograms()
+
+
+def is_measured(route):
+    return route.split(':', 1)[0] in settings.METRICS_NAMESPACES
+
+
+def render_prometheus(data):
+    """Текстовый формат Prometheus: гистограмма на каждую метрику."""
+    lines = []
+    for metric in METRICS:
+        family = f'yatube_{metric}_seconds'
+        lines.append(f'# TYPE {family} histogram')
+        for route, metrics in data.items():
+            values = metrics[metric]
+            if not values['count']:
+                continue
+            label = f'route="{route}"'
+            total = 0
+            for bound, count in zip([*BUCKETS, '+Inf'], values['buckets']):
+                total += count
+                lines.append(f'{family}_bucket{{{label},le="{bound}"}} '
+                             f'{total}')
+            lines.append(f'{family}_sum{{{label}}} '
+                         f'{values["sum"] / MICROSECONDS}')
+            lines.append(f'{family}_count{{{label}}} {values["count"]}')
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,72 @@
+import logging
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connection
+
+from . import metrics
+from .queries import get_budget, record_queries
+
+logger = logging.getLogger(__name__)
+
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+
+class QueryBudgetMiddleware:
+    """Считает запросы к БД каждого ответа и ищет среди них N+1.
+
+    Бюджет маршрута берётся из QUERY_BUDGETS по имени вида 'posts:index'.
+    При QUERY_BUDGET_RAISE нарушение превращается в исключение,
+    иначе пишется предупреждение в лог.
+    """
+
+    def __init__(self, get_response):
+        if not settings.QUERY_BUDGET_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with record_queries() as recorder:
+            response = self.get_response(request)
+        match = request.resolver_match
+        if match is None:
+            return response
+        problems = []
+        budget = get_budget(match.view_name)
+        if len(recorder) > budget:
+            problems.append(f'{match.view_name}: запросов {len(recorder)}, '
+                            f'бюджет {budget}')
+        report = recorder.report()
+        if report:
+            problems.append(f'{match.view_name}: {report}')
+        for problem in problems:
+            if settings.QUERY_BUDGET_RAISE:
+                raise QueryBudgetExceeded(problem)
+            logger.warning(problem)
+        return response
+
+
+class MetricsMiddleware:
+    """Время ответа, SQL, шаблонов и миниатюр в заголовке Server-Timing.
+
+    Для маршрутов из METRICS_NAMESPACES замеры попадают в гистограммы,
+    которые отдаёт core.views.metrics.
+    """
+
+    def __init__(self, get_response):
+        if not settings.METRICS_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with metrics.collect() as timings:
+            with metrics.timed('total'), \
+                    connection.execute_wrapper(metrics.time_query):
+                response = self.get_response(request)
+        response['Server-Timing'] = timings.header()
+        match = request.resolver_match
+        if match is not None and metrics.is_measured(match.view_name):
+            metrics.histograms.observe(match.view_name, timings)
+        return response
@@ -0,0 +1,102 @@
+import os
+import re
+import sys
+from collections import defaultdict
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import connection
+
+NUMBER = re.compile(r'\b\d+(\.\d+)?\b')
+STRING = re.compile(r"'(?:[^']|'')*'")
+IN_LIST = re.compile(r'\bIN \((?:\s*(?:\?|%s|%\(\w+\)s)\s*,?)+\)', re.I)
+SPACES = re.compile(r'\s+')
+THIS_FILE = os.path.abspath(__file__)
+
+
+def fingerprint(sql):
+    """SQL без литералов и с IN (...) любой длины — для сравнения запросов."""
+    sql = STRING.sub('?', sql)
+    sql = NUMBER.sub('?', sql)
+    sql = sql.replace('%s', '?')
+    sql = IN_LIST.sub('IN (...)', sql)
+    return SPACES.sub(' ', sql).strip()
+
+
+def find_origin():
+    """Место, откуда выполнен запрос: строка шаблона и строка кода проекта.
+
+    Шаблонный узел берётся из кадра Node.render_annotated, код —
+    из ближайшего кадра внутри BASE_DIR.
+    """
+    template = code = None
+    frame = sys._getframe(2)
+    while frame is not None and not (template and code):
+        node = frame.f_locals.get('self')
+        if (template is None and frame.f_code.co_name == 'render_annotated'
+                and getattr(node, 'origin', None) is not None):
+            template = f'{node.origin.template_name}:{node.token.lineno}'
+        filename = frame.f_code.co_filename
+        if (code is None and filename.startswith(settings.BASE_DIR)
+                and filename != THIS_FILE):
+            relative = os.path.relpath(filename, settings.BASE_DIR)
+            code = f'{relative}:{frame.f_lineno}'
+        frame = frame.f_back
+    return template or code
+
+
+class QueryRecorder:
+    """Обёртка execute_wrapper, которая запоминает все запросы к БД."""
+
+    def __init__(self):
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        self.queries.append((fingerprint(sql), find_origin()))
+        return execute(sql, params, many, context)
+
+    def __len__(self):
+        return len(self.queries)
+
+    def repeated(self, threshold=None):
+        """Отпечатки, повторённые не меньше threshold раз: вероятные N+1."""
+        if threshold is None:
+            threshold = settings.QUERY_N_PLUS_ONE_THRESHOLD
+        origins = defaultdict(list)
+        for sql, origin in self.queries:
+            origins[sql].append(origin)
+        return {sql: places for sql, places in origins.items()
+                if len(places) >= threshold}
+
+    def report(self, threshold=None):
+        lines = []
+        for sql, places in self.repeated(threshold).items():
+            lines.append(f'N+1: {len(places)} раз из '
+                         f'{", ".join(sorted(set(filter(None, places))))}')
+            lines.append(f'    {sql}')
+        return '\n'.join(lines)
+
+
+@contextmanager
+def record_queries(using=connection):
+    recorder = QueryRecorder()
+    with using.execute_wrapper(recorder):
+        yield recorder
+
+
+@contextmanager
+def assert_query_budget(budget, threshold=None, using=connection):
+    """Тестовый помощник: падает при превышении бюджета или N+1."""
+    with record_queries(using) as recorder:
+        yield recorder
+    problems = []
+    if len(recorder) > budget:
+        problems.append(f'Запросов {len(recorder)}, бюджет {budget}')
+    if recorder.repeated(threshold):
+        problems.append(recorder.report(threshold))
+    if problems:
+        raise AssertionError('\n'.join(problems))
+
+
+def get_budget(route):
+    return settings.QUERY_BUDGETS.get(route, settings.QUERY_BUDGET_DEFAULT)
@@ -0,0 +1,98 @@
+import gzip
+import hashlib
+import os
+import posixpath
+import tempfile
+
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core.files.storage import FileSystemStorage
+
+INCOMING_DIR = '.incoming'
+# Права нового файла, как у open(): 0o666 без битов umask.
+DEFAULT_FILE_MODE = 0o666
+COMPRESSIBLE = ('.css', '.js', '.svg', '.txt', '.html', '.json', '.map')
+MIN_COMPRESS_SIZE = 256
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """Статика с хешем в имени и сжатой копией .gz рядом.
+
+    Хеш позволяет отдавать файлы с бессрочным кешированием, а готовые
+    .gz веб-сервер отдаёт без сжатия на лету (gzip_static в nginx).
+    """
+
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run, **options)
+        if dry_run:
+            return
+        for name in set(self.hashed_files.values()):
+            self.compress(name)
+
+    def compress(self, name):
+        if not name.endswith(COMPRESSIBLE):
+            return
+        path = self.path(name)
+        with open(path, 'rb') as file:
+            data = file.read()
+        if len(data) < MIN_COMPRESS_SIZE:
+            return
+        compressed = gzip.compress(data, compresslevel=9, mtime=0)
+        if len(compressed) < len(data):
+            with open(f'{path}.gz', 'wb') as file:
+                file.write(compressed)
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """Медиафайлы с именем по SHA-256 содержимого.
+
+    posts/photo.JPG сохраняется как posts/ab/cd/abcd….jpg: два уровня
+    каталогов держат их небольшими, а одинаковые загрузки получают одно
+    имя и хранятся один раз. Хеш считается по мере записи во временный
+    файл, который затем жёсткой ссылкой публикуется под итоговым именем;
+    если файл уже есть, копия просто удаляется.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # umask читается один раз: os.umask меняет его для всего процесса,
+        # а migrate_media сохраняет файлы из нескольких потоков.
+        self._umask = os.umask(0)
+        os.umask(self._umask)
+
+    def get_available_name(self, name, max_length=None):
+        return name
+
+    def file_mode(self):
+        if self.file_permissions_mode is not None:
+            return self.file_permissions_mode
+        return DEFAULT_FILE_MODE & ~self._umask
+
+    def content_name(self, name, digest):
+        directory, basename = posixpath.split(name)
+        extension = os.path.splitext(basename)[1].lower()
+        return posixpath.join(directory, digest[:2], digest[2:4],
+                              digest + extension)
+
+    def _save(self, name, content):
+        incoming = self.path(INCOMING_DIR)
+        os.makedirs(incoming, exist_ok=True)
+        descriptor, temporary = tempfile.mkstemp(dir=incoming)
+        digest = hashlib.sha256()
+        try:
+            with os.fdopen(descriptor, 'wb') as file:
+                for chunk in content.chunks():
+                    digest.update(chunk)
+                    file.write(chunk)
+            # mkstemp создаёт файл с правами 0600, а жёсткая ссылка
+            # публикует тот же inode: без chmod веб-сервер его не прочтёт.
+            os.chmod(temporary, self.file_mode())
+            name = self.content_name(name, digest.hexdigest())
+            path = self.path(name)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            try:
+                os.link(temporary, path)
+            except FileExistsError:
+                pass
+        finally:
+            os.remove(temporary)
+        return name
@@ -0,0 +1,149 @@
+import json
+import logging
+import time
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.db.models import Avg, Count, F, Max
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import Task
+
+logger = logging.getLogger(__name__)
+
+
+def task(priority=0, max_attempts=None):
+    """Делает функцию фоновой задачей: func.delay(*args) ставит её в очередь.
+
+    Строка Task создаётся в текущей транзакции, поэтому воркер увидит её
+    только вместе с данными запроса. Аргументы — значения JSON;
+    countdown откладывает запуск на столько секунд.
+    При TASKS_EAGER задача выполняется сразу, без очереди.
+    """
+    def decorator(func):
+        name = f'{func.__module__}.{func.__name__}'
+
+        def delay(*args, countdown=0):
+            if settings.TASKS_EAGER:
+                return run_eager(func, args)
+            return Task.objects.create(
+                name=name,
+                arguments=json.dumps(args),
+                priority=priority,
+                max_attempts=max_attempts or settings.TASK_MAX_ATTEMPTS,
+                run_at=timezone.now() + timedelta(seconds=countdown),
+            )
+        func.is_task = True
+        func.delay = delay
+        return func
+    return decorator
+
+
+def run_eager(func, args):
+    try:
+        func(*args)
+    except Exception:
+        logger.exception('Задача %s завершилась ошибкой', func.__name__)
+
+
+def requeue_stale():
+    """Возвращает в очередь задачи упавших воркеров.
+
+    Задача, у которой попытки исчерпаны, помечается ошибкой: иначе
+    задача, которая роняет воркер, выполнялась бы бесконечно.
+    """
+    now = timezone.now()
+    stale = Task.objects.filter(
+        status=Task.RUNNING,
+        started__lt=now - timedelta(seconds=settings.TASK_STALE_TIMEOUT))
+    stale.filter(attempts__gte=F('max_attempts')).update(
+        status=Task.FAILED, finished=now,
+        error='Воркер не завершил задачу за TASK_STALE_TIMEOUT')
+    return stale.filter(attempts__lt=F('max_attempts')).update(
+        status=Task.QUEUED)
+
+
+def prune(days=None):
+    """Удаляет выполненные задачи старше TASK_RETENTION_DAYS дней.
+
+    Задачи с ошибкой остаются для разбора. Возвращает число удалённых.
+    """
+    if days is None:
+        days = settings.TASK_RETENTION_DAYS
+    old = timezone.now() - timedelta(days=days)
+    deleted, _ = Task.objects.filter(status=Task.DONE,
+                                     finished__lt=old).delete()
+    return deleted
+
+
+def claim():
+    """Забирает самую приоритетную готовую задачу или возвращает None.
+
+    UPDATE с условием на статус срабатывает только у одного воркера,
+    поэтому блокировки строк не нужны и SQLite подходит.
+    """
+    now = timezone.now()
+    queued = Task.objects.filter(status=Task.QUEUED, run_at__lte=now)
+    for pk in queued.order_by('-priority', 'run_at', 'pk').values_list(
+            'pk', flat=True)[:5]:
+        claimed = Task.objects.filter(pk=pk, status=Task.QUEUED).update(
+            status=Task.RUNNING, started=now, attempts=F('attempts') + 1)
+        if claimed:
+            return Task.objects.get(pk=pk)
+    return None
+
+
+def execute(job):
+    started = time.monotonic()
+    try:
+        func = import_string(job.name)
+        if not getattr(func, 'is_task', False):
+            raise ValueError(f'{job.name} не объявлена задачей')
+        func(*json.loads(job.arguments))
+    except Exception:
+        job.error = traceback.format_exc()
+        if job.attempts < job.max_attempts:
+            job.status = Task.QUEUED
+            job.run_at = timezone.now() + timedelta(
+                seconds=settings.TASK_RETRY_DELAY * 2 ** (job.attempts - 1))
+        else:
+            job.status = Task.FAILED
+        logger.warning('Задача %s (попытка %s): ошибка', job.name,
+                       job.attempts, exc_info=True)
+    else:
+        job.status = Task.DONE
+    job.finished = timezone.now()
+    job.duration = time.monotonic() - started
+    job.save(update_fields=['status', 'run_at', 'finished', 'duration',
+                            'error'])
+    close_old_connections()
+    return job
+
+
+def work(burst=False, sleep=1.0, limit=None):
+    """Цикл воркера; при burst выходит, когда очередь пуста."""
+    done = 0
+    requeue_stale()
+    prune()
+    while limit is None or done < limit:
+        job = claim()
+        if job is None:
+            if burst:
+                break
+            time.sleep(sleep)
+            requeue_stale()
+            continue
+        execute(job)
+        done += 1
+    return done
+
+
+def stats():
+    """Метрики по задачам: число по статусам и длительность выполнения."""
+    return (Task.objects.values('name', 'status')
+            .annotate(count=Count('pk'), avg=Avg('duration'),
+                      max=Max('duration'))
+            .order_by('name', 'status'))
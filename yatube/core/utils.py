@@ -0,0 +1,11 @@
+from itertools import islice
+
+
+def batched(items, size):
+    """Списки по size элементов из любого итерируемого, последний короче."""
+    items = iter(items)
+    while True:
+        batch = list(islice(items, size))
+        if not batch:
+            return
+        yield batch
@@ -1,5 +1,11 @@
+import hmac
+
+from django.conf import settings
+from django.http import Http404, HttpResponse
 from django.shortcuts import render
 
+from . import metrics as instrumentation
+
 STATUS_404 = 404
 STATUS_500 = 500
 STATUS_403 = 403
@@ -20,3 +26,20 @@ def permission_denied_view(request, exception):
 
 def csrf_failure(request, reason=''):
     return render(request, 'core/403csrf.html')
+
+
+def metrics(request):
+    """Гистограммы MetricsMiddleware в текстовом формате Prometheus.
+
+    Доступны только с заголовком Authorization: Bearer METRICS_TOKEN;
+    пока токен не задан, адреса нет. REMOTE_ADDR не проверяется: за
+    локальным прокси все запросы приходят с 127.0.0.1.
+    """
+    token = settings.METRICS_TOKEN
+    supplied = request.META.get('HTTP_AUTHORIZATION', '')
+    if not token or not hmac.compare_digest(supplied.encode(),
+                                            f'Bearer {token}'.encode()):
+        raise Http404
+    return HttpResponse(
+        instrumentation.render_prometheus(instrumentation.histograms.read()),
+        content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -0,0 +1,131 @@
+import json
+
+from django.conf import settings
+from django.db.models import F
+from django.http import HttpResponse
+from django.views.decorators.http import require_GET
+
+from . import counters, pagecache, timeline
+from .models import Group, Post, User
+from .paginators import KeysetPaginator
+from .views import NUMBER_OF_COMMENTS, NUMBER_OF_POSTS, posts_feed
+
+POST_FIELDS = ('id', 'text', 'pub_date', 'image', 'comments_count')
+POST_RELATED = {'username': F('author__username'),
+                'group_slug': F('group__slug')}
+COMMENT_FIELDS = ('id', 'text', 'created')
+COMMENT_RELATED = {'username': F('author__username')}
+CONTENT_TYPE = 'application/json; charset=utf-8'
+NOT_FOUND = 'Не найдено'
+NOT_AUTHENTICATED = 'Требуется авторизация'
+
+
+def encode_value(value):
+    return value.isoformat()
+
+
+def json_response(data, status=200):
+    """Компактный JSON: строки values() сериализуются как есть.
+
+    Даты переводит default, поэтому для каждой строки не строится
+    промежуточный словарь.
+    """
+    content = json.dumps(data, ensure_ascii=False, separators=(',', ':'),
+                         check_circular=False, default=encode_value)
+    return HttpResponse(content, content_type=CONTENT_TYPE, status=status)
+
+
+def error(detail, status):
+    return json_response({'detail': detail}, status=status)
+
+
+def post_rows(posts):
+    return posts.values(*POST_FIELDS, **POST_RELATED)
+
+
+def comment_rows(post_id):
+    return (Post(pk=post_id).comments.all()
+            .values(*COMMENT_FIELDS, **COMMENT_RELATED))
+
+
+def page_data(page):
+    return {
+        'results': page.object_list,
+        'next': page.next_cursor,
+        'previous': page.previous_cursor,
+    }
+
+
+def feed_response(request, posts, **extra):
+    page = KeysetPaginator(post_rows(posts), NUMBER_OF_POSTS).get_page(
+        request.GET.get('cursor'))
+    return json_response({**extra, 'media_url': settings.MEDIA_URL,
+                          **page_data(page)})
+
+
+def comments_page(request, post_id):
+    return KeysetPaginator(comment_rows(post_id), NUMBER_OF_COMMENTS,
+                           field='created').get_page(
+        request.GET.get('cursor'))
+
+
+@require_GET
+@pagecache.conditional(pagecache.index_tags)
+def index(request):
+    return feed_response(request, posts_feed())
+
+
+@require_GET
+@pagecache.conditional(pagecache.group_tags)
+def group_posts(request, slug):
+    group = Group.objects.filter(slug=slug).values(
+        'id', 'slug', 'title', 'description').first()
+    if group is None:
+        return error(NOT_FOUND, 404)
+    return feed_response(request, posts_feed().filter(group_id=group['id']),
+                         group=group)
+
+
+@require_GET
+@pagecache.conditional(pagecache.profile_tags)
+def profile(request, username):
+    author = User.objects.select_related('counter').filter(
+        username=username).first()
+    if author is None:
+        return error(NOT_FOUND, 404)
+    counter = counters.get_counter(author)
+    return feed_response(request, posts_feed().filter(author=author), author={
+        'username': author.username,
+        'full_name': author.get_full_name(),
+        'posts': counter.posts,
+        'followers': counter.followers,
+        'following': counter.following,
+    })
+
+
+@require_GET
+@pagecache.conditional(pagecache.post_tags)
+def post_detail(request, post_id):
+    post = post_rows(Post.objects.filter(pk=post_id)).first()
+    if post is None:
+        return error(NOT_FOUND, 404)
+    return json_response({
+        'media_url': settings.MEDIA_URL,
+        'post': post,
+        'comments': page_data(comments_page(request, post_id)),
+    })
+
+
+@require_GET
+@pagecache.conditional(pagecache.post_tags)
+def post_comments(request, post_id):
+    if not Post.objects.filter(pk=post_id).exists():
+        return error(NOT_FOUND, 404)
+    return json_response(page_data(comments_page(request, post_id)))
+
+
+@require_GET
+def follow_index(request):
+    if not request.user.is_authenticated:
+        return error(NOT_AUTHENTICATED, 401)
+    return feed_response(request, timeline.follow_feed(request.user))
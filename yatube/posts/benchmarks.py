@@ -0,0 +1,342 @@
+import json
+import os
+import random
+import secrets
+import subprocess
+import sys
+import tempfile
+import time
+from itertools import accumulate
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from core.utils import batched
+from . import counters, feed, notifications, search, timeline
+from .models import Comment, FeedEntry, Follow, Group, Post, User
+from .urls import urlpatterns
+
+USERNAME_PREFIX = 'bench_'
+PERCENTILES = (50, 95, 99)
+# Адрес вне INTERNAL_IPS: debug toolbar не искажает замеры.
+CLIENT_ADDR = '192.0.2.1'
+# Маршруты, которые меняют данные: GET от имени --user отписал бы его
+# от автора или открыл формы записи. Их не замеряем.
+MUTATING_ROUTES = ('profile_follow', 'profile_unfollow', 'add_comment',
+                   'post_create', 'post_update')
+
+
+def popularity(count, exponent=1.2):
+    """Веса по закону Ципфа: немного популярных авторов и длинный хвост."""
+    return [1 / (rank + 1) ** exponent for rank in range(count)]
+
+
+@transaction.atomic
+def seed(users, posts, groups, follows, comments, batch_size=5000,
+         random_seed=0):
+    """Заполняет базу синтетическими данными для замеров.
+
+    Авторы постов, подписок и комментариев выбираются по весам Ципфа,
+    поэтому граф подписок похож на настоящий: у немногих авторов
+    тысячи подписчиков, у большинства — единицы.
+    """
+    from faker import Faker
+
+    fake = Faker('ru_RU')
+    fake.seed_instance(random_seed)
+    rng = random.Random(random_seed)
+    start = User.objects.count()
+    for batch in batched(range(start, start + users), batch_size):
+        User.objects.bulk_create([
+            User(username=f'{USERNAME_PREFIX}{number}',
+                 first_name=fake.first_name(), last_name=fake.last_name(),
+                 password='!')
+            for number in batch
+        ])
+    Group.objects.bulk_create([
+        Group(title=fake.sentence(nb_words=3)[:200],
+              slug=f'{USERNAME_PREFIX}{start}_{number}',
+              description=fake.paragraph())
+        for number in range(groups)
+    ])
+    user_ids = list(User.objects.filter(
+        username__startswith=USERNAME_PREFIX).values_list('pk', flat=True))
+    group_ids = list(Group.objects.values_list('pk', flat=True)) + [None]
+    # Накопленные веса считаются один раз: иначе choices() пересчитывает
+    # их за O(users) на каждом вызове.
+    weights = list(accumulate(popularity(len(user_ids))))
+    for batch in batched(range(posts), batch_size):
+        authors = rng.choices(user_ids, cum_weights=weights, k=len(batch))
+        Post.objects.bulk_create([
+            Post(author_id=author_id, group_id=rng.choice(group_ids),
+                 text=fake.paragraph(nb_sentences=rng.randint(1, 8)))
+            for author_id in authors
+        ])
+    pairs = (
+        (user_id, author_id)
+        for user_id in user_ids
+        for author_id in set(
+            rng.choices(user_ids, cum_weights=weights, k=follows))
+        if user_id != author_id
+    )
+    for batch in batched(pairs, batch_size):
+        Follow.objects.bulk_create(
+            [Follow(user_id=user_id, author_id=author_id)
+             for user_id, author_id in batch],
+            ignore_conflicts=True,
+        )
+    post_ids = list(Post.objects.order_by('pk').values_list('pk', flat=True))
+    post_weights = list(accumulate(
+        popularity(len(post_ids), exponent=0.8)[::-1]))
+    for batch in batched(range(comments), batch_size):
+        Comment.objects.bulk_create([
+            Comment(post_id=post_id, author_id=rng.choice(user_ids),
+                    text=fake.sentence())
+            for post_id in rng.choices(post_ids, cum_weights=post_weights,
+                                       k=len(batch))
+        ])
+    search.get_backend().rebuild(batch_size)
+    feed.rebuild(batch_size)
+    counters.reconcile()
+    timeline.rebuild(batch_size)
+
+
+def route_kwargs():
+    """Аргументы для маршрутов posts: самые «тяжёлые» автор, группа и пост."""
+    author = (User.objects.filter(counter__isnull=False)
+              .order_by('-counter__followers').first()
+              or User.objects.first())
+    post = Post.objects.order_by('-comments_count').first()
+    group = Group.objects.order_by('-pk').first()
+    return {
+        'username': author.username if author else '',
+        'post_id': post.pk if post else 0,
+        'slug': group.slug if group else '',
+    }
+
+
+def route_urls():
+    values = route_kwargs()
+    urls = {}
+    for pattern in urlpatterns:
+        if not pattern.name or pattern.name in MUTATING_ROUTES:
+            continue
+        names = pattern.pattern.converters.keys()
+        urls[pattern.name] = reverse(
+            f'posts:{pattern.name}',
+            kwargs={name: values[name] for name in names},
+        )
+    return urls
+
+
+def percentile(values, percent):
+    ordered = sorted(values)
+    index = round(percent / 100 * (len(ordered) - 1))
+    return ordered[index]
+
+
+def measure(client, url, requests, warmup):
+    timings = []
+    queries = []
+    status = None
+    for number in range(warmup + requests):
+        with CaptureQueriesContext(connection) as captured:
+            started = time.perf_counter()
+            try:
+                status = client.get(url).status_code
+            except Exception as error:
+                status = type(error).__name__
+            elapsed = (time.perf_counter() - started) * 1000
+        if number >= warmup:
+            timings.append(elapsed)
+            queries.append(len(captured))
+    result = {f'p{percent}': round(percentile(timings, percent), 3)
+              for percent in PERCENTILES}
+    result['queries'] = max(queries)
+    result['status'] = status
+    return result
+
+
+def run(requests=50, warmup=5, username=None, routes=None):
+    """Замеры p50/p95/p99 (мс) и числа запросов к БД по маршрутам posts."""
+    client = Client(REMOTE_ADDR=CLIENT_ADDR)
+    if username:
+        client.force_login(User.objects.get(username=username))
+    results = {}
+    for name, url in route_urls().items():
+        if routes and name not in routes:
+            continue
+        results[name] = measure(client, url, requests, warmup)
+        results[name]['url'] = url
+    return results
+
+
+def compare(results, baseline, threshold):
+    """Список регрессий относительно baseline.
+
+    Регрессия — рост p95 больше чем в (1 + threshold) раз
+    или любое увеличение числа запросов к БД.
+    """
+    regressions = []
+    for name, current in results.items():
+        previous = baseline.get(name)
+        if previous is None:
+            continue
+        if current['p95'] > previous['p95'] * (1 + threshold):
+            regressions.append(
+                f'{name}: p95 {previous["p95"]} -> {current["p95"]} мс')
+        if current['queries'] > previous['queries']:
+            regressions.append(
+                f'{name}: запросов {previous["queries"]} -> '
+                f'{current["queries"]}')
+    return regressions
+
+
+def query_plans():
+    """Планы запросов лент, подписок и комментариев (EXPLAIN)."""
+    kwargs = route_kwargs()
+    author = User.objects.get(username=kwargs['username'])
+    post = Post.objects.get(pk=kwargs['post_id'])
+    group = Group.objects.get(slug=kwargs['slug'])
+    querysets = {
+        'author_feed': author.posts.all()[:10],
+        'group_feed': group.posts.all()[:10],
+        'follow_lookup': Follow.objects.filter(user=author, author=author),
+        'follow_feed': Post.objects.filter(
+            author__following__user=author)[:10],
+        'comments': post.comments.all()[:10],
+        'entry_index': FeedEntry.objects.all()[:10],
+        'entry_author_feed': FeedEntry.objects.filter(author=author)[:10],
+        'entry_group_feed': FeedEntry.objects.filter(group=group)[:10],
+    }
+    plans = {}
+    for name, queryset in querysets.items():
+        started = time.perf_counter()
+        list(queryset)
+        elapsed = (time.perf_counter() - started) * 1000
+        plans[name] = (queryset.explain(), round(elapsed, 3))
+    return plans
+
+
+def measure_cache(cache, operations=10000, keys=1000):
+    """Средняя длительность (мкс) основных операций кеша."""
+    value = 'x' * 2048
+    names = [f'bench:{number % keys}' for number in range(operations)]
+    cache.set('bench:counter', 0)
+    timings = {
+        'set': lambda name: cache.set(name, value),
+        'get': cache.get,
+        'get_many': lambda name: cache.get_many(names[:10]),
+        'incr': lambda name: cache.incr('bench:counter'),
+    }
+    results = {}
+    for operation, call in timings.items():
+        started = time.perf_counter()
+        for name in names:
+            call(name)
+        elapsed = time.perf_counter() - started
+        results[operation] = round(elapsed / operations * 1_000_000, 2)
+    cache.clear()
+    return results
+
+
+def measure_notifications(followers=100000, batch_size=5000):
+    """Секунды на уведомления и дайджесты для подписчиков одного автора.
+
+    Данные создаются в транзакции, которая затем откатывается; письма
+    уходят в EMAIL_BACKEND из настроек.
+    """
+    results = {}
+    with transaction.atomic():
+        author = User.objects.create(username=f'{USERNAME_PREFIX}author',
+                                     password='!')
+        for batch in batched(range(followers), batch_size):
+            User.objects.bulk_create([
+                User(username=f'{USERNAME_PREFIX}reader_{number}',
+                     email=f'reader_{number}@example.com', password='!')
+                for number in batch
+            ])
+        reader_ids = User.objects.filter(
+            username__startswith=f'{USERNAME_PREFIX}reader_'
+        ).values_list('pk', flat=True)
+        for batch in batched(reader_ids.iterator(), batch_size):
+            Follow.objects.bulk_create([
+                Follow(user_id=user_id, author=author) for user_id in batch
+            ])
+        post = Post.objects.create(author=author, text='Новый пост')
+        started = time.perf_counter()
+        results['notifications'] = notifications.notify_followers(post.pk)
+        results['notify'] = round(time.perf_counter() - started, 2)
+        started = time.perf_counter()
+        results['emails'] = notifications.send_digests()
+        results['send'] = round(time.perf_counter() - started, 2)
+        transaction.set_rollback(True)
+    results['per_second'] = round(
+        results['emails'] / max(results['notify'] + results['send'], 1e-6))
+    return results
+
+
+# Переменные окружения профилей настроек для benchmark_profiles.
+PROFILES = {
+    'development': {'YATUBE_PROFILE': ''},
+    'production': {'YATUBE_PROFILE': 'production'},
+}
+STARTUP_CODE = ('import django; django.setup(); '
+                'from django.urls import resolve; import yatube.wsgi; '
+                'resolve("/")')
+
+
+def manage(env, *args):
+    return subprocess.run(
+        [sys.executable, 'manage.py', *args], env=env, cwd=settings.BASE_DIR,
+        check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+def measure_profile(profile, requests=50, warmup=5, startup_runs=5,
+                    routes=None):
+    """Запуск процесса (мс, медиана) и маршруты posts в профиле настроек.
+
+    Каждый профиль работает в отдельном процессе с общей базой, но со
+    своими каталогом статики и файлом кеша во временной папке.
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        env = {
+            **os.environ,
+            **PROFILES[profile],
+            'DJANGO_SETTINGS_MODULE': 'yatube.settings',
+            'YATUBE_SECRET_KEY': (os.environ.get('YATUBE_SECRET_KEY')
+                                  or secrets.token_urlsafe(50)),
+            'YATUBE_STATIC_ROOT': os.path.join(directory, 'static'),
+            'YATUBE_CACHE_PATH': os.path.join(directory, 'cache.sqlite3'),
+        }
+        manage(env, 'collectstatic', '--noinput', '-v0')
+        startup = []
+        for _ in range(startup_runs):
+            started = time.perf_counter()
+            subprocess.run([sys.executable, '-c', STARTUP_CODE], env=env,
+                           cwd=settings.BASE_DIR, check=True)
+            startup.append((time.perf_counter() - started) * 1000)
+        baseline = os.path.join(directory, 'routes.json')
+        arguments = ['benchmark_urls', f'--requests={requests}',
+                     f'--warmup={warmup}', f'--save-baseline={baseline}']
+        for route in routes or []:
+            arguments.append(f'--route={route}')
+        manage(env, *arguments)
+        return {
+            'startup': round(percentile(startup, 50), 1),
+            'routes': load_baseline(baseline),
+        }
+
+
+def load_baseline(path):
+    with open(path, encoding='utf-8') as file:
+        return json.load(file)
+
+
+def save_baseline(path, results):
+    with open(path, 'w', encoding='utf-8') as file:
+        json.dump(results, file, ensure_ascii=False, indent=2,
+                  sort_keys=True)
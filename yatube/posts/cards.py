@@ -0,0 +1,57 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+from .feed import FEED_CARD_TEMPLATE
+from .models import FeedEntry
+
+CARD_TEMPLATE = 'includes/publication_card.html'
+CARD_TEMPLATES = (CARD_TEMPLATE, FEED_CARD_TEMPLATE)
+
+
+def card_key(post_id, pub_date, template=CARD_TEMPLATE):
+    """Ключ карточки: версия и имя шаблона, id поста и штамп его даты.
+
+    Дата публикации защищает от повторно использованного id,
+    правки поста сбрасываются сигналами через invalidate().
+    """
+    stamp = int(pub_date.timestamp() * 1_000_000)
+    return (f'post_card:{settings.POST_CARD_VERSION}:{template}:'
+            f'{post_id}:{stamp}')
+
+
+def card_template(post):
+    """Посты и записи FeedEntry выводятся разными шаблонами."""
+    if isinstance(post, FeedEntry):
+        return FEED_CARD_TEMPLATE
+    return CARD_TEMPLATE
+
+
+def render_cards(posts):
+    """HTML карточек постов: кешированные достаются одним get_many."""
+    posts = list(posts)
+    keys = {card_key(post.pk, post.pub_date, card_template(post)): post
+            for post in posts if not getattr(post, 'snippet', None)}
+    cached = cache.get_many(keys)
+    rendered = {}
+    cards = []
+    for post in posts:
+        template = card_template(post)
+        key = card_key(post.pk, post.pub_date, template)
+        html = cached.get(key)
+        if html is None:
+            html = render_to_string(template, {'post': post})
+            if key in keys:
+                rendered[key] = html
+        cards.append(mark_safe(html))
+    if rendered:
+        cache.set_many(rendered, settings.POST_CARD_TIMEOUT)
+    return cards
+
+
+def invalidate(posts):
+    """Сбрасывает карточки для пар (id, pub_date)."""
+    cache.delete_many([card_key(pk, pub_date, template)
+                       for pk, pub_date in posts
+                       for template in CARD_TEMPLATES])
@@ -0,0 +1,76 @@
+from django.db import IntegrityError
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from core.utils import batched
+from . import cards
+from .models import Comment, FeedEntry, Follow, Post, User, UserCounter
+
+INVALIDATE_BATCH_SIZE = 1000
+
+
+def counted(model, field, outer='pk'):
+    """Подзапрос с числом строк model, ссылающихся на внешнюю строку."""
+    rows = (model.objects.filter(**{field: OuterRef(outer)}).order_by()
+            .values(field).annotate(total=Count('pk')).values('total'))
+    return Coalesce(Subquery(rows, output_field=IntegerField()), 0)
+
+
+def get_counter(user):
+    """Счётчики пользователя; при отсутствии строки считаются один раз."""
+    try:
+        return user.counter
+    except UserCounter.DoesNotExist:
+        pass
+    counter = UserCounter(
+        user=user,
+        posts=Post.objects.filter(author=user).count(),
+        followers=Follow.objects.filter(author=user).count(),
+        following=Follow.objects.filter(user=user).count(),
+    )
+    try:
+        UserCounter.objects.bulk_create([counter])
+    except IntegrityError:
+        counter = UserCounter.objects.get(user=user)
+    user.counter = counter
+    return counter
+
+
+def change(user_id, field, delta=1):
+    # Отставший счётчик не уходит ниже нуля: поля PositiveIntegerField.
+    UserCounter.objects.filter(
+        user_id=user_id, **{f'{field}__gte': -delta}).update(
+        **{field: F(field) + delta})
+
+
+def change_comments(post_id, delta=1):
+    Post.objects.filter(pk=post_id, comments_count__gte=-delta).update(
+        comments_count=F('comments_count') + delta)
+    FeedEntry.objects.filter(pk=post_id, comments_count__gte=-delta).update(
+        comments_count=F('comments_count') + delta)
+
+
+def reconcile():
+    """Пересчитывает все счётчики несколькими пакетными UPDATE.
+
+    Карточки постов, у которых изменится число комментариев, сбрасываются.
+    """
+    stale = (Post.objects.annotate(actual=counted(Comment, 'post'))
+             .exclude(comments_count=F('actual'))
+             .values_list('pk', 'pub_date'))
+    for batch in batched(stale.iterator(), INVALIDATE_BATCH_SIZE):
+        cards.invalidate(batch)
+    missing = User.objects.filter(counter__isnull=True).values_list(
+        'pk', flat=True)
+    UserCounter.objects.bulk_create(
+        [UserCounter(user_id=pk) for pk in missing.iterator()],
+        ignore_conflicts=True,
+    )
+    users = UserCounter.objects.update(
+        posts=counted(Post, 'author', 'user_id'),
+        followers=counted(Follow, 'author', 'user_id'),
+        following=counted(Follow, 'user', 'user_id'),
+    )
+    posts = Post.objects.update(comments_count=counted(Comment, 'post'))
+    FeedEntry.objects.update(comments_count=counted(Comment, 'post', 'pk'))
+    return users, posts
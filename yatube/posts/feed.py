@@ -0,0 +1,88 @@
+from django.conf import settings
+from django.utils.text import Truncator
+
+from .models import FeedEntry, Post
+
+FEED_CARD_TEMPLATE = 'includes/feed_card.html'
+
+
+def entry_values(post):
+    """Поля FeedEntry из поста с загруженными author и group."""
+    group = post.group
+    return {
+        'pub_date': post.pub_date,
+        'author_id': post.author_id,
+        'author_username': post.author.username,
+        'author_full_name': post.author.get_full_name(),
+        'group_id': post.group_id,
+        'group_slug': group.slug if group else '',
+        'group_title': group.title if group else '',
+        'excerpt': Truncator(post.text).chars(settings.FEED_EXCERPT_LENGTH),
+        'image': post.image.name or '',
+        'placeholder': post.placeholder,
+        'comments_count': post.comments_count,
+    }
+
+
+def sync_post(post):
+    """Создаёт или обновляет запись поста.
+
+    Адреса миниатюр сохраняются, пока картинка та же; для новой их
+    заполнит задача thumbnails.generate. Число комментариев существующей
+    записи не переписывается: его меняют UPDATE с F() (posts.counters).
+    """
+    values = entry_values(post)
+    comments_count = values.pop('comments_count')
+    if FeedEntry.objects.filter(pk=post.pk, image=values['image']).update(
+            **values):
+        return
+    if FeedEntry.objects.filter(pk=post.pk).update(
+            **values, thumbnail_url='', thumbnail_srcset=''):
+        return
+    FeedEntry.objects.get_or_create(
+        post_id=post.pk,
+        defaults={**values, 'comments_count': comments_count})
+
+
+def sync_author(user):
+    FeedEntry.objects.filter(author=user).update(
+        author_username=user.username,
+        author_full_name=user.get_full_name(),
+    )
+
+
+def sync_group(group, deleted=False):
+    FeedEntry.objects.filter(group=group).update(
+        group_slug='' if deleted else group.slug,
+        group_title='' if deleted else group.title,
+    )
+
+
+def set_thumbnail(image, url, srcset):
+    FeedEntry.objects.filter(image=image).update(thumbnail_url=url,
+                                                 thumbnail_srcset=srcset)
+
+
+def add_posts(post_ids):
+    """Записи для постов, созданных bulk_create без сигналов."""
+    posts = Post.objects.select_related('author', 'group').filter(
+        pk__in=post_ids)
+    FeedEntry.objects.bulk_create(
+        [FeedEntry(post_id=post.pk, **entry_values(post)) for post in posts],
+        ignore_conflicts=True,
+    )
+
+
+def rebuild(batch_size=1000):
+    """Заполняет таблицу заново после пакетной загрузки без сигналов."""
+    FeedEntry.objects.all().delete()
+    posts = Post.objects.select_related('author', 'group').order_by('pk')
+    total = 0
+    batch = []
+    for post in posts.iterator(chunk_size=batch_size):
+        batch.append(FeedEntry(post_id=post.pk, **entry_values(post)))
+        if len(batch) == batch_size:
+            total += len(FeedEntry.objects.bulk_create(batch))
+            batch = []
+    total += len(FeedEntry.objects.bulk_create(batch))
+    return total
@@ -1,5 +1,9 @@
 from django import forms
+from django.conf import settings
+from django.core.files.uploadedfile import UploadedFile
+from django.template.defaultfilters import filesizeformat
 
+from . import images
 from .models import Comment, Post
 
 
@@ -18,6 +22,35 @@ class PostForm(forms.ModelForm):
             'image': 'Картинка к Вашему посту'
         }
 
+    def clean_image(self):
+        """Проверяет размеры новой картинки, нормализует её и готовит заглушку.
+
+        Ширина и высота берутся из заголовка, который уже прочитал
+        ImageField, поэтому слишком большие картинки не декодируются.
+        """
+        image = self.cleaned_data.get('image')
+        if image is False:
+            self.instance.placeholder = ''
+        if not isinstance(image, UploadedFile):
+            return image
+        if image.size > settings.IMAGE_MAX_UPLOAD_SIZE:
+            raise forms.ValidationError(
+                'Файл больше '
+                f'{filesizeformat(settings.IMAGE_MAX_UPLOAD_SIZE)}.')
+        width, height = image.image.size
+        if width * height > settings.IMAGE_MAX_PIXELS:
+            raise forms.ValidationError(
+                f'Картинка {width}×{height} слишком велика.')
+        # Небольшая картинка без EXIF проходит normalize() нетронутой
+        # и впервые декодируется целиком только в placeholder().
+        try:
+            image, self.image_report = images.normalize(image)
+            self.instance.placeholder = images.placeholder(image)
+        except images.DECODE_ERRORS:
+            raise forms.ValidationError(
+                'Не удалось прочитать картинку: файл повреждён.')
+        return image
+
 
 class CommentForm(forms.ModelForm):
     class Meta:
@@ -0,0 +1,110 @@
+import base64
+import logging
+import os
+import tempfile
+import time
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files import File
+from PIL import Image, ImageOps, features
+
+from core.metrics import timed
+
+logger = logging.getLogger(__name__)
+
+# Перекодирование испортило бы анимацию и палитру GIF.
+KEEP_FORMATS = ('GIF',)
+EXTENSIONS = {'WEBP': '.webp', 'JPEG': '.jpg', 'PNG': '.png'}
+# Ошибки декодирования файла, который прошёл проверку заголовка:
+# обрезанный JPEG, бомба распаковки.
+DECODE_ERRORS = (OSError, Image.DecompressionBombError)
+
+
+def has_alpha(image):
+    return image.mode in ('RGBA', 'LA') or 'transparency' in image.info
+
+
+def output_format(image):
+    """WebP, если Pillow собран с ним, иначе JPEG или PNG для прозрачных."""
+    if features.check('webp'):
+        return 'WEBP'
+    return 'PNG' if has_alpha(image) else 'JPEG'
+
+
+def needs_processing(image):
+    """Слишком большая картинка или картинка с EXIF."""
+    if image.format in KEEP_FORMATS:
+        return False
+    return (max(image.size) > settings.IMAGE_MAX_SIDE
+            or bool(image.getexif()))
+
+
+def reencode(image, name):
+    """Уменьшает картинку до IMAGE_MAX_SIDE и сохраняет без EXIF.
+
+    thumbnail() для JPEG сначала уменьшает картинку при декодировании
+    (draft), поэтому большие фотографии целиком не распаковываются.
+    Поворот из EXIF применяется к пикселям до того, как EXIF отброшен.
+    """
+    side = settings.IMAGE_MAX_SIDE
+    image.thumbnail((side, side), Image.LANCZOS)
+    image = ImageOps.exif_transpose(image)
+    format = output_format(image)
+    if format == 'JPEG' and image.mode != 'RGB':
+        image = image.convert('RGB')
+    elif format != 'JPEG' and image.mode not in ('RGB', 'RGBA'):
+        image = image.convert('RGBA' if has_alpha(image) else 'RGB')
+    result = File(tempfile.TemporaryFile(),
+                  os.path.splitext(name)[0] + EXTENSIONS[format])
+    image.save(result.file, format, quality=settings.IMAGE_QUALITY,
+               optimize=True, exif=b'',
+               icc_profile=image.info.get('icc_profile'))
+    result.size = result.file.tell()
+    result.seek(0)
+    return result
+
+
+def normalize(upload):
+    """Готовит загруженную картинку к хранению.
+
+    GIF и небольшие картинки без EXIF сохраняются как есть, остальные
+    перекодируются (reencode). Возвращает файл и отчёт с размерами до
+    и после в байтах и временем обработки в секундах.
+    """
+    started = time.perf_counter()
+    original = upload.size
+    with timed('image'):
+        upload.seek(0)
+        with Image.open(upload) as image:
+            if needs_processing(image):
+                upload = reencode(image, upload.name)
+        upload.seek(0)
+    report = {
+        'original': original,
+        'stored': upload.size,
+        'seconds': round(time.perf_counter() - started, 3),
+    }
+    logger.info('%s: %d -> %d байт за %.3f с', upload.name,
+                report['original'], report['stored'], report['seconds'])
+    return upload, report
+
+
+def placeholder(file):
+    """Data URI крошечной копии картинки размером POST_PLACEHOLDER_SIZE.
+
+    Обрезка по центру, как у миниатюр, поэтому размытая заглушка
+    совпадает с картинкой, которая её заменит.
+    """
+    size = settings.POST_PLACEHOLDER_SIZE
+    file.seek(0)
+    with Image.open(file) as image:
+        image.draft('RGB', size)
+        image = ImageOps.exif_transpose(image).convert('RGB')
+    image = ImageOps.fit(image, size, Image.BILINEAR)
+    buffer = BytesIO()
+    image.save(buffer, 'JPEG', quality=settings.POST_PLACEHOLDER_QUALITY,
+               optimize=True)
+    file.seek(0)
+    encoded = base64.b64encode(buffer.getvalue()).decode()
+    return f'data:image/jpeg;base64,{encoded}'
@@ -0,0 +1,37 @@
+import os
+import tempfile
+
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.management.base import BaseCommand
+
+from core.cache import SQLiteCache
+from posts import benchmarks
+
+ROW = '{:<12} {:>10} {:>10} {:>10} {:>10}'
+
+
+class Command(BaseCommand):
+    help = ('Сравнивает среднюю длительность операций LocMemCache '
+            'и общего SQLiteCache, мкс.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--operations', type=int, default=10000)
+        parser.add_argument('--keys', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        with tempfile.TemporaryDirectory() as directory:
+            backends = {
+                'locmem': LocMemCache('benchmark', {
+                    'OPTIONS': {'MAX_ENTRIES': options['keys'] * 2}}),
+                'sqlite': SQLiteCache(
+                    os.path.join(directory, 'cache.sqlite3'), {
+                        'OPTIONS': {'MAX_ENTRIES': options['keys'] * 2}}),
+            }
+            self.stdout.write(ROW.format(
+                'backend', 'set', 'get', 'get_many', 'incr'))
+            for name, cache in backends.items():
+                result = benchmarks.measure_cache(
+                    cache, options['operations'], options['keys'])
+                self.stdout.write(ROW.format(
+                    name, result['set'], result['get'], result['get_many'],
+                    result['incr']))
@@ -0,0 +1,27 @@
+import tempfile
+
+from django.core.management.base import BaseCommand
+from django.test import override_settings
+
+from posts import benchmarks
+
+
+class Command(BaseCommand):
+    help = ('Замеряет создание уведомлений и рассылку дайджестов '
+            'подписчикам одного автора через файловый почтовый бэкенд.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--followers', type=int, default=100000)
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        with tempfile.TemporaryDirectory() as directory, override_settings(
+                EMAIL_BACKEND='django.core.mail.backends.filebased'
+                              '.EmailBackend',
+                EMAIL_FILE_PATH=directory, TASKS_EAGER=False):
+            result = benchmarks.measure_notifications(
+                options['followers'], options['batch_size'])
+        self.stdout.write(
+            'Уведомлений: {notifications} за {notify} с; '
+            'писем: {emails} за {send} с; {per_second} писем/с'.format(
+                **result))
@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand
+
+from posts import benchmarks
+
+ROW = '{:<18} {:>14} {:>14} {:>14} {:>14}'
+
+
+class Command(BaseCommand):
+    help = ('Сравнивает время запуска процесса и задержку маршрутов posts '
+            'в профилях настроек development и production.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=50)
+        parser.add_argument('--warmup', type=int, default=5)
+        parser.add_argument('--startup-runs', type=int, default=5)
+        parser.add_argument('--route', action='append', dest='routes',
+                            help='Замерять только этот маршрут.')
+
+    def handle(self, *args, **options):
+        results = {
+            profile: benchmarks.measure_profile(
+                profile, options['requests'], options['warmup'],
+                options['startup_runs'], options['routes'])
+            for profile in benchmarks.PROFILES
+        }
+        development, production = results['development'], results['production']
+        self.stdout.write(
+            f'Запуск, мс: development {development["startup"]}, '
+            f'production {production["startup"]}')
+        self.stdout.write(ROW.format(
+            'route', 'dev p50, мс', 'prod p50, мс', 'dev p95, мс',
+            'prod p95, мс'))
+        for name, result in development['routes'].items():
+            other = production['routes'][name]
+            self.stdout.write(ROW.format(
+                name, result['p50'], other['p50'], result['p95'],
+                other['p95']))
@@ -0,0 +1,51 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import benchmarks
+
+ROW = '{:<18} {:>9} {:>9} {:>9} {:>8} {:>7}'
+
+
+class Command(BaseCommand):
+    help = ('Измеряет задержку (p50/p95/p99) и число SQL-запросов '
+            'для каждого маршрута posts и сравнивает с базовой линией.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=50)
+        parser.add_argument('--warmup', type=int, default=5)
+        parser.add_argument('--user', help='Имя пользователя для входа.')
+        parser.add_argument('--route', action='append', dest='routes',
+                            help='Замерять только этот маршрут.')
+        parser.add_argument('--save-baseline', metavar='PATH')
+        parser.add_argument('--baseline', metavar='PATH')
+        parser.add_argument('--threshold', type=float, default=0.2,
+                            help='Допустимый рост p95, доля от базовой.')
+        parser.add_argument('--explain', action='store_true',
+                            help='Показать планы запросов лент и подписок.')
+
+    def handle(self, *args, **options):
+        if options['explain']:
+            for name, (plan, elapsed) in benchmarks.query_plans().items():
+                self.stdout.write(f'{name} ({elapsed} мс):\n{plan}\n')
+            return
+        results = benchmarks.run(
+            requests=options['requests'],
+            warmup=options['warmup'],
+            username=options['user'],
+            routes=options['routes'],
+        )
+        self.stdout.write(ROW.format(
+            'route', 'p50, мс', 'p95, мс', 'p99, мс', 'queries', 'status'))
+        for name, result in results.items():
+            self.stdout.write(ROW.format(
+                name, result['p50'], result['p95'], result['p99'],
+                result['queries'], result['status']))
+        if options['save_baseline']:
+            benchmarks.save_baseline(options['save_baseline'], results)
+        if options['baseline']:
+            regressions = benchmarks.compare(
+                results, benchmarks.load_baseline(options['baseline']),
+                options['threshold'])
+            if regressions:
+                raise CommandError(
+                    'Регрессии производительности:\n' + '\n'.join(regressions))
+            self.stdout.write(self.style.SUCCESS('Регрессий нет'))
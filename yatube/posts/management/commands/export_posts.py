@@ -0,0 +1,34 @@
+import sys
+import time
+
+from django.core.management.base import BaseCommand
+
+from posts import transfer
+
+
+class Command(BaseCommand):
+    help = ('Потоково выгружает посты, комментарии или подписки '
+            'в NDJSON или CSV.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', choices=transfer.FIELDS)
+        parser.add_argument('path', help="Файл или '-' для stdout.")
+        parser.add_argument('--format', choices=('ndjson', 'csv'))
+        parser.add_argument('--batch-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        path = options['path']
+        file_format = options['format'] or transfer.guess_format(path)
+        rows = transfer.export_rows(options['kind'], options['batch_size'])
+        fields = transfer.FIELDS[options['kind']]
+        if path == '-':
+            transfer.write_rows(sys.stdout, file_format, fields, rows)
+            return
+        with open(path, 'w', encoding='utf-8', newline='') as file:
+            total = transfer.write_rows(file, file_format, fields, rows)
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Выгружено записей: {total} за {elapsed:.2f} с '
+            f'({total / max(elapsed, 1e-6):.0f} записей/с)'
+        ))
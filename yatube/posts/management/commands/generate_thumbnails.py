@@ -0,0 +1,64 @@
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from core.utils import batched
+from posts import thumbnails
+
+UPLOAD_DIR = 'posts'
+
+logger = logging.getLogger(__name__)
+
+
+def generate_batch(names):
+    failed = 0
+    for name in names:
+        try:
+            thumbnails.generate(name)
+        except Exception:
+            logger.exception('Не удалось создать миниатюры %s', name)
+            failed += 1
+    return len(names), failed
+
+
+def generate_batch_in_process(names):
+    try:
+        return generate_batch(names)
+    finally:
+        connections.close_all()
+
+
+def find_images(root):
+    for dirpath, _, filenames in os.walk(os.path.join(root, UPLOAD_DIR)):
+        for filename in filenames:
+            yield os.path.relpath(os.path.join(dirpath, filename), root)
+
+
+class Command(BaseCommand):
+    help = 'Создаёт миниатюры для уже загруженных картинок постов.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=os.cpu_count())
+        parser.add_argument('--batch-size', type=int, default=50)
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        batches = batched(find_images(settings.MEDIA_ROOT),
+                          options['batch_size'])
+        if options['processes'] > 1:
+            connections.close_all()
+            with ProcessPoolExecutor(options['processes']) as pool:
+                results = list(pool.map(generate_batch_in_process, batches))
+        else:
+            results = [generate_batch(batch) for batch in batches]
+        total = sum(done for done, _ in results)
+        failed = sum(failed for _, failed in results)
+        self.stdout.write(self.style.SUCCESS(
+            f'Обработано картинок: {total}, ошибок: {failed} '
+            f'за {time.monotonic() - started:.2f} с'
+        ))
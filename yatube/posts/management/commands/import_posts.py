@@ -0,0 +1,48 @@
+import os
+import sys
+import time
+
+from django.core.management.base import BaseCommand
+
+from posts import transfer
+
+
+class Command(BaseCommand):
+    help = ('Потоково загружает посты, комментарии или подписки '
+            'из NDJSON или CSV пакетами через bulk_create.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', choices=transfer.FIELDS)
+        parser.add_argument('path', help="Файл или '-' для stdin.")
+        parser.add_argument('--format', choices=('ndjson', 'csv'))
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--media-root',
+                            help='Каталог с картинками постов из файла; '
+                                 'без него картинки не копируются.')
+        parser.add_argument('--workers', type=int, default=os.cpu_count(),
+                            help='Потоков для копирования картинок.')
+        parser.add_argument('--ignore-conflicts', action='store_true',
+                            help='Пропускать уже загруженные записи.')
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        path = options['path']
+        file_format = options['format'] or transfer.guess_format(path)
+        importer = transfer.Importer(
+            batch_size=options['batch_size'],
+            media_root=options['media_root'],
+            workers=options['workers'],
+            ignore_conflicts=options['ignore_conflicts'],
+        )
+        if path == '-':
+            rows = transfer.read_rows(sys.stdin, file_format)
+            total = importer.run(options['kind'], rows)
+        else:
+            with open(path, encoding='utf-8', newline='') as file:
+                rows = transfer.read_rows(file, file_format)
+                total = importer.run(options['kind'], rows)
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Загружено записей: {total} за {elapsed:.2f} с '
+            f'({total / max(elapsed, 1e-6):.0f} записей/с)'
+        ))
@@ -0,0 +1,28 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core.storage import ContentAddressedStorage
+from posts import transfer
+
+
+class Command(BaseCommand):
+    help = ('Переносит картинки постов в хранилище по хешу содержимого '
+            '(core.storage.ContentAddressedStorage).')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=8)
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--delete', action='store_true',
+                            help='Удалить старые файлы после переноса.')
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        files, posts = transfer.migrate_images(
+            ContentAddressedStorage(location=settings.MEDIA_ROOT),
+            options['workers'], options['batch_size'], options['delete'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Файлов: {files}, постов: {posts} '
+            f'за {time.monotonic() - started:.2f} с'
+        ))
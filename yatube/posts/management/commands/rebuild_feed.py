@@ -0,0 +1,19 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from posts import feed
+
+
+class Command(BaseCommand):
+    help = 'Перестраивает таблицу лент FeedEntry пакетами.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        total = feed.rebuild(options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Записей ленты: {total} за {time.monotonic() - started:.2f} с'
+        ))
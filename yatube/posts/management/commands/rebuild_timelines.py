@@ -0,0 +1,20 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from posts import timeline
+
+
+class Command(BaseCommand):
+    help = ('Перестраивает ленты подписок TIMELINE_BACKEND из подписок '
+            'и постов.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        total = timeline.rebuild(options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Лент: {total} за {time.monotonic() - started:.2f} с'
+        ))
@@ -0,0 +1,17 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from posts import counters
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает денормализованные счётчики постов и подписок.'
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        users, posts = counters.reconcile()
+        self.stdout.write(self.style.SUCCESS(
+            f'Пользователей: {users}, постов: {posts} '
+            f'за {time.monotonic() - started:.2f} с'
+        ))
@@ -0,0 +1,79 @@
+# Generated by Django 2.2.16 on 2026-10-18 18:02
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+from django.utils.text import Truncator
+
+BATCH_SIZE = 1000
+
+
+def fill_feed(apps, schema_editor):
+    Post = apps.get_model('posts', 'Post')
+    FeedEntry = apps.get_model('posts', 'FeedEntry')
+    posts = Post.objects.select_related('author', 'group').order_by('pk')
+    batch = []
+    for post in posts.iterator(chunk_size=BATCH_SIZE):
+        group = post.group
+        batch.append(FeedEntry(
+            post_id=post.pk, pub_date=post.pub_date,
+            author_id=post.author_id,
+            author_username=post.author.username,
+            author_full_name=f'{post.author.first_name} '
+                             f'{post.author.last_name}'.strip(),
+            group_id=post.group_id,
+            group_slug=group.slug if group else '',
+            group_title=group.title if group else '',
+            excerpt=Truncator(post.text).chars(
+                settings.FEED_EXCERPT_LENGTH),
+            image=post.image.name or '',
+            comments_count=post.comments_count,
+        ))
+        if len(batch) == BATCH_SIZE:
+            FeedEntry.objects.bulk_create(batch)
+            batch = []
+    FeedEntry.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('posts', '0012_notification'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FeedEntry',
+            fields=[
+                ('post', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='feed_entry', serialize=False, to='posts.Post')),
+                ('pub_date', models.DateTimeField()),
+                ('author_username', models.CharField(max_length=150)),
+                ('author_full_name', models.CharField(blank=True, max_length=300)),
+                ('group_slug', models.CharField(blank=True, max_length=200)),
+                ('group_title', models.CharField(blank=True, max_length=200)),
+                ('excerpt', models.TextField()),
+                ('image', models.CharField(blank=True, max_length=100)),
+                ('thumbnail_url', models.CharField(blank=True, max_length=255)),
+                ('comments_count', models.PositiveIntegerField(default=0)),
+                ('author', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('group', models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='posts.Group')),
+            ],
+            options={
+                'ordering': ['-pub_date'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='feedentry',
+            index=models.Index(fields=['-pub_date'], name='feed_pub_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='feedentry',
+            index=models.Index(fields=['author', '-pub_date'], name='feed_author_pub_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='feedentry',
+            index=models.Index(fields=['group', '-pub_date'], name='feed_group_pub_date_idx'),
+        ),
+        migrations.RunPython(fill_feed, migrations.RunPython.noop),
+    ]
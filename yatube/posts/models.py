@@ -36,15 +36,37 @@ class Post(models.Model):
         upload_to='posts/',
         blank=True
     )
+    comments_count = models.PositiveIntegerField(default=0, editable=False)
+    # Data URI крошечной копии картинки (posts.images.placeholder).
+    placeholder = models.TextField(blank=True, default='', editable=False)
 
     class Meta:
         verbose_name = 'post'
         verbose_name_plural = 'posts'
         ordering = ['-pub_date']
+        indexes = [
+            models.Index(fields=['author', '-pub_date'],
+                         name='post_author_pub_date_idx'),
+            models.Index(fields=['group', '-pub_date'],
+                         name='post_group_pub_date_idx'),
+        ]
 
     def __str__(self):
         return self.text[:15]
 
+    def save(self, *args, **kwargs):
+        """Полная запись существующего поста не трогает comments_count.
+
+        Счётчик меняется только UPDATE с F() (posts.counters), а значение
+        в памяти формы или админки могло устареть.
+        """
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name != 'comments_count'
+            ]
+        super().save(*args, **kwargs)
+
 
 class Comment(models.Model):
     post = models.ForeignKey(Post,
@@ -58,6 +80,10 @@ class Comment(models.Model):
 
     class Meta:
         ordering = ['-created']
+        indexes = [
+            models.Index(fields=['post', '-created'],
+                         name='comment_post_created_idx'),
+        ]
 
     def __str__(self):
         return self.text[:15]
@@ -70,3 +96,100 @@ class Follow(models.Model):
     author = models.ForeignKey(User,
                                on_delete=models.CASCADE,
                                related_name='following')
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'author'],
+                                    name='unique_follow'),
+        ]
+
+
+class UserCounter(models.Model):
+    user = models.OneToOneField(User,
+                                on_delete=models.CASCADE,
+                                primary_key=True,
+                                related_name='counter')
+    posts = models.PositiveIntegerField(default=0)
+    followers = models.PositiveIntegerField(default=0)
+    following = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f'{self.user}: {self.posts}/{self.followers}/{self.following}'
+
+
+class TimelineEntry(models.Model):
+    user = models.ForeignKey(User,
+                             on_delete=models.CASCADE,
+                             related_name='timeline')
+    post = models.ForeignKey(Post,
+                             on_delete=models.CASCADE,
+                             related_name='timeline_entries')
+    pub_date = models.DateTimeField()
+
+    class Meta:
+        ordering = ['-pub_date']
+        unique_together = ('user', 'post')
+        indexes = [
+            models.Index(fields=['user', '-pub_date'],
+                         name='timeline_user_pub_date_idx'),
+        ]
+
+
+class Notification(models.Model):
+    """Неотправленное уведомление о новом посте; удаляется после письма."""
+    user = models.ForeignKey(User,
+                             on_delete=models.CASCADE,
+                             related_name='notifications')
+    post = models.ForeignKey(Post,
+                             on_delete=models.CASCADE,
+                             related_name='notifications')
+
+    class Meta:
+        unique_together = ('user', 'post')
+
+
+class FeedEntry(models.Model):
+    """Денормализованная карточка поста для лент.
+
+    Хранит всё, что показывает лента, поэтому страница читается одним
+    запросом к этой таблице без JOIN с User и Group. Синхронизируется
+    сигналами (posts.feed), включается настройкой FEED_READ_MODEL.
+    """
+    post = models.OneToOneField(Post,
+                                on_delete=models.CASCADE,
+                                primary_key=True,
+                                related_name='feed_entry')
+    pub_date = models.DateTimeField()
+    author = models.ForeignKey(User,
+                               on_delete=models.CASCADE,
+                               related_name='+',
+                               db_index=False)
+    author_username = models.CharField(max_length=150)
+    author_full_name = models.CharField(max_length=300, blank=True)
+    group = models.ForeignKey(Group,
+                              blank=True,
+                              null=True,
+                              on_delete=models.SET_NULL,
+                              related_name='+',
+                              db_index=False)
+    group_slug = models.CharField(max_length=200, blank=True)
+    group_title = models.CharField(max_length=200, blank=True)
+    excerpt = models.TextField()
+    image = models.CharField(max_length=100, blank=True)
+    thumbnail_url = models.CharField(max_length=255, blank=True)
+    thumbnail_srcset = models.TextField(blank=True, default='')
+    placeholder = models.TextField(blank=True, default='')
+    comments_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        ordering = ['-pub_date']
+        indexes = [
+            models.Index(fields=['-pub_date'], name='feed_pub_date_idx'),
+            models.Index(fields=['author', '-pub_date'],
+                         name='feed_author_pub_date_idx'),
+            models.Index(fields=['group', '-pub_date'],
+                         name='feed_group_pub_date_idx'),
+        ]
+
+    def __str__(self):
+        return self.excerpt[:15]
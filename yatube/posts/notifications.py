@@ -0,0 +1,94 @@
+from itertools import groupby
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.template.loader import get_template
+
+from core.tasks import task
+from .models import Follow, Notification, Post, User
+
+DIGEST_SUBJECT = 'Новые записи в ваших подписках'
+DIGEST_TEMPLATE = 'posts/email/digest.txt'
+
+
+@task(priority=5)
+def notify_followers(post_id):
+    """Создаёт уведомления для подписчиков автора поста пакетами."""
+    author_id = (Post.objects.filter(pk=post_id)
+                 .values_list('author_id', flat=True).first())
+    if author_id is None:
+        return 0
+    followers = (Follow.objects.filter(author_id=author_id)
+                 .exclude(user__email='').order_by()
+                 .values_list('user_id', flat=True))
+    batch = []
+    total = 0
+    for user_id in followers.iterator(
+            chunk_size=settings.NOTIFICATION_BATCH_SIZE):
+        batch.append(Notification(user_id=user_id, post_id=post_id))
+        if len(batch) == settings.NOTIFICATION_BATCH_SIZE:
+            total += len(Notification.objects.bulk_create(
+                batch, ignore_conflicts=True))
+            batch = []
+    total += len(Notification.objects.bulk_create(batch,
+                                                  ignore_conflicts=True))
+    if total:
+        send_digests.delay(countdown=settings.NOTIFICATION_DIGEST_DELAY)
+    return total
+
+
+def build_digest(template, user, posts):
+    return EmailMessage(
+        DIGEST_SUBJECT,
+        template.render({
+            'user': user,
+            'posts': posts,
+            'site_url': settings.NOTIFICATION_SITE_URL,
+        }),
+        to=[user.email],
+    )
+
+
+def send_batch(connection, user_ids):
+    """Одно письмо на пользователя со всеми его новыми постами."""
+    notifications = list(
+        Notification.objects.filter(user_id__in=user_ids)
+        .select_related('post__author').order_by('user_id', '-post__pub_date')
+    )
+    users = User.objects.in_bulk(user_ids)
+    template = get_template(DIGEST_TEMPLATE)
+    messages = [
+        build_digest(template, users[user_id], [item.post for item in items])
+        for user_id, items in groupby(notifications,
+                                      key=lambda item: item.user_id)
+    ]
+    connection.send_messages(messages)
+    Notification.objects.filter(
+        pk__in=[item.pk for item in notifications]).delete()
+    return len(messages)
+
+
+@task()
+def send_digests():
+    """Рассылает дайджесты пакетами по одному соединению на пакет.
+
+    Уведомления, накопившиеся за NOTIFICATION_DIGEST_DELAY, попадают
+    в одно письмо, а не в письмо на каждый пост.
+    """
+    sent = 0
+    last_user_id = 0
+    pending = Notification.objects.order_by('user_id').values_list(
+        'user_id', flat=True).distinct()
+    connection = get_connection()
+    with connection:
+        while True:
+            user_ids = list(pending.filter(user_id__gt=last_user_id)
+                            [:settings.NOTIFICATION_BATCH_SIZE])
+            if not user_ids:
+                return sent
+            sent += send_batch(connection, user_ids)
+            last_user_id = user_ids[-1]
+
+
+def schedule(post):
+    notify_followers.delay(post.pk)
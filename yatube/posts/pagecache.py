@@ -0,0 +1,140 @@
+import hashlib
+import time
+from datetime import datetime, timezone
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.cache import patch_vary_headers
+from django.views.decorators.http import condition
+
+from .models import Group, Post, User
+
+SITE_TAG = 'site'
+
+
+def tag_key(tag):
+    return f'page_tag:{tag}'
+
+
+def page_key(request):
+    path = hashlib.md5(request.get_full_path().encode()).hexdigest()
+    return f'page:{path}'
+
+
+def generations(tags):
+    """Текущие поколения тегов; для новых тегов поколение создаётся.
+
+    Поколение — время создания (time.time()), поэтому по нему же
+    строится заголовок Last-Modified.
+    """
+    keys = {tag_key(tag): tag for tag in tags}
+    stored = cache.get_many(keys)
+    missing = [key for key in keys if key not in stored]
+    for key in missing:
+        cache.add(key, time.time(), timeout=None)
+    if missing:
+        stored.update(cache.get_many(missing))
+    return {keys[key]: value for key, value in stored.items()}
+
+
+def tag(request, *tags):
+    """Помечает кешируемый ответ тегами, по которым его сбросят сигналы.
+
+    Поколения снимаются до чтения данных: правка, пришедшая во время
+    рендеринга, сменит поколение, и такой ответ не будет выдан.
+    """
+    page_tags = getattr(request, '_page_tags', None)
+    if page_tags is not None:
+        page_tags.update(generations(tags))
+
+
+def purge(*tags):
+    cache.delete_many([tag_key(tag) for tag in tags])
+
+
+def cache_for_anonymous(view):
+    """Кеширует ответы анонимным посетителям по пути и строке запроса.
+
+    Запись хранит поколения своих тегов; сброс тега (purge) меняет
+    поколение, и все страницы с этим тегом перестают совпадать.
+    Авторизованные пользователи кеш не используют.
+    """
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if (not settings.PAGE_CACHE_ENABLED or request.method != 'GET'
+                or request.user.is_authenticated):
+            return view(request, *args, **kwargs)
+        key = page_key(request)
+        entry = cache.get(key)
+        if entry is not None:
+            page_tags, response = entry
+            if generations(page_tags) == page_tags:
+                return response
+        request._page_tags = generations([SITE_TAG])
+        response = view(request, *args, **kwargs)
+        patch_vary_headers(response, ['Cookie'])
+        if response.status_code == 200 and not response.cookies:
+            cache.set(key, (request._page_tags, response),
+                      settings.PAGE_CACHE_TIMEOUT)
+        return response
+    return wrapper
+
+
+def index_tags():
+    return ['index']
+
+
+def group_tags(slug):
+    pk = Group.objects.filter(slug=slug).values_list('pk', flat=True).first()
+    return None if pk is None else [f'group:{pk}']
+
+
+def profile_tags(username):
+    pk = (User.objects.filter(username=username)
+          .values_list('pk', flat=True).first())
+    return None if pk is None else [f'author:{pk}']
+
+
+def post_tags(post_id):
+    author_id = (Post.objects.filter(pk=post_id)
+                 .values_list('author_id', flat=True).first())
+    return None if author_id is None else [f'post:{post_id}',
+                                           f'author:{author_id}']
+
+
+def validators(request, tags):
+    """ETag и Last-Modified страницы по поколениям её тегов.
+
+    В ETag входят зритель и его CSRF-cookie: у авторизованного в форме
+    страницы есть токен, а подписка меняет поколение тега автора.
+    """
+    stamps = generations([SITE_TAG, *tags])
+    viewer = request.user.pk if request.user.is_authenticated else ''
+    csrf = request.COOKIES.get(settings.CSRF_COOKIE_NAME, '') if viewer else ''
+    parts = [request.get_full_path(), str(viewer), csrf]
+    parts.extend(f'{tag}={stamps[tag]}' for tag in sorted(stamps))
+    etag = hashlib.md5('|'.join(parts).encode()).hexdigest()
+    last_modified = datetime.fromtimestamp(max(stamps.values()), timezone.utc)
+    return etag, last_modified
+
+
+def conditional(tags_func):
+    """Условный GET: 304 без рендеринга, если теги страницы не сброшены.
+
+    tags_func получает аргументы представления и возвращает теги
+    страницы или None, если объекта нет (тогда ответ строится как обычно).
+    """
+    def get_validators(request, *args, **kwargs):
+        if not hasattr(request, '_page_validators'):
+            tags = tags_func(*args, **kwargs)
+            request._page_validators = (
+                (None, None) if tags is None else validators(request, tags))
+        return request._page_validators
+
+    def etag(request, *args, **kwargs):
+        return get_validators(request, *args, **kwargs)[0]
+
+    def last_modified(request, *args, **kwargs):
+        return get_validators(request, *args, **kwargs)[1]
+    return condition(etag_func=etag, last_modified_func=last_modified)
@@ -0,0 +1,222 @@
+import base64
+import binascii
+import hashlib
+from collections.abc import Sequence
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.paginator import EmptyPage, Paginator
+from django.db.models import Q, QuerySet
+from django.utils.dateparse import parse_datetime
+from django.utils.functional import cached_property
+
+NEXT = 'n'
+PREVIOUS = 'p'
+ELLIPSIS = '…'
+
+
+def get_position(obj, field):
+    """Ключ (значение поля, pk) для модели или словаря из values()."""
+    if isinstance(obj, dict):
+        return obj[field], obj.get('pk', obj.get('id'))
+    return getattr(obj, field), obj.pk
+
+
+def encode_cursor(position, direction=NEXT):
+    value, pk = position
+    raw = f'{direction}|{value.isoformat()}|{pk}'.encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Разбирает курсор в (направление, значение, pk) или возвращает None."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        direction, value, pk = raw.decode().split('|')
+        value = parse_datetime(value)
+        pk = int(pk)
+    except (ValueError, binascii.Error, UnicodeDecodeError):
+        return None
+    if direction not in (NEXT, PREVIOUS) or value is None:
+        return None
+    return direction, value, pk
+
+
+class KeysetPage(Sequence):
+    is_keyset = True
+
+    def __init__(self, object_list, paginator, has_next, has_previous):
+        self.object_list = object_list
+        self.paginator = paginator
+        self._has_next = has_next
+        self._has_previous = has_previous
+
+    def __repr__(self):
+        return f'<KeysetPage of {len(self)} objects>'
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+    def has_other_pages(self):
+        return self._has_next or self._has_previous
+
+    @property
+    def next_cursor(self):
+        if not self._has_next:
+            return None
+        return self.paginator.cursor_for(self.object_list[-1], NEXT)
+
+    @property
+    def previous_cursor(self):
+        if not self._has_previous:
+            return None
+        return self.paginator.cursor_for(self.object_list[0], PREVIOUS)
+
+
+class KeysetPaginator:
+    """Постраничный вывод по ключу (field, pk) без COUNT(*) и OFFSET.
+
+    Стоимость страницы не зависит от её глубины: каждая страница —
+    это один запрос с условием по ключу и LIMIT per_page + 1.
+    """
+
+    def __init__(self, object_list, per_page, field='pub_date'):
+        self.object_list = object_list
+        self.per_page = per_page
+        self.field = field
+
+    def cursor_for(self, obj, direction=NEXT):
+        return encode_cursor(get_position(obj, self.field), direction)
+
+    def get_page(self, cursor=None):
+        position = decode_cursor(cursor) if cursor else None
+        field = self.field
+        queryset = self.object_list
+        if position is None:
+            direction, value, pk = NEXT, None, None
+        else:
+            direction, value, pk = position
+        if direction == NEXT:
+            queryset = queryset.order_by(f'-{field}', '-pk')
+            if value is not None:
+                queryset = queryset.filter(
+                    Q(**{f'{field}__lt': value})
+                    | Q(**{field: value, 'pk__lt': pk})
+                )
+        else:
+            queryset = queryset.order_by(field, 'pk').filter(
+                Q(**{f'{field}__gt': value})
+                | Q(**{field: value, 'pk__gt': pk})
+            )
+        rows = list(queryset[:self.per_page + 1])
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if direction == PREVIOUS:
+            rows.reverse()
+            return KeysetPage(rows, self, has_next=True, has_previous=has_more)
+        return KeysetPage(rows, self, has_next=has_more,
+                          has_previous=value is not None)
+
+
+def estimate_count(object_list):
+    """Число объектов из кеша: COUNT(*) выполняется раз в FEED_COUNT_TIMEOUT.
+
+    Оценка нужна только для номеров страниц: содержимое страницы
+    FeedPaginator от неё не зависит.
+    """
+    if not isinstance(object_list, QuerySet):
+        return len(object_list)
+    sql, params = object_list.query.sql_with_params()
+    key = 'feed-count:' + hashlib.md5(f'{sql}|{params}'.encode()).hexdigest()
+    count = cache.get(key)
+    if count is None:
+        count = object_list.count()
+        cache.set(key, count, settings.FEED_COUNT_TIMEOUT)
+    return count
+
+
+class FeedPaginator(Paginator):
+    """Paginator для больших лент: оценка числа постов и окно номеров.
+
+    count берётся из переданного счётчика или из estimate_count, а не из
+    COUNT(*) на каждый запрос. Страница читается с LIMIT per_page + 1
+    и уточняет count, поэтому has_next() точен, даже если оценка
+    устарела. Шаблон выводит только page.elided_page_range, а не все
+    номера страниц.
+    """
+
+    ELLIPSIS = ELLIPSIS
+
+    def __init__(self, object_list, per_page, count=None):
+        super().__init__(object_list, per_page)
+        self.known_count = count
+
+    @cached_property
+    def count(self):
+        if self.known_count is not None:
+            return self.known_count
+        return estimate_count(self.object_list)
+
+    def set_count(self, count):
+        self.__dict__['count'] = count
+        self.__dict__.pop('num_pages', None)
+
+    def validate_number(self, number):
+        """Как в Paginator, но без проверки по оценке числа страниц."""
+        try:
+            number = int(number)
+        except (TypeError, ValueError):
+            number = 1
+        return max(number, 1)
+
+    def page(self, number):
+        number = self.validate_number(number)
+        bottom = (number - 1) * self.per_page
+        rows = list(self.object_list[bottom:bottom + self.per_page + 1])
+        has_next = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if not rows and number > 1:
+            raise EmptyPage('Страница не содержит результатов')
+        if not has_next:
+            self.set_count(bottom + len(rows))
+        elif self.count <= bottom + self.per_page:
+            self.set_count(bottom + self.per_page + 1)
+        page = self._get_page(rows, number, self)
+        page.elided_page_range = list(self.get_elided_page_range(number))
+        return page
+
+    def get_page(self, number):
+        try:
+            return self.page(number)
+        except EmptyPage:
+            self.set_count(super().count)
+            return self.page(self.num_pages)
+
+    def get_elided_page_range(self, number=1, on_each_side=3, on_ends=2):
+        """Номера страниц вокруг текущей и по краям, пропуски — ELLIPSIS."""
+        number = self.validate_number(number)
+        if self.num_pages <= (on_each_side + on_ends) * 2:
+            yield from self.page_range
+            return
+        if number > 1 + on_each_side + on_ends + 1:
+            yield from range(1, on_ends + 1)
+            yield self.ELLIPSIS
+            yield from range(number - on_each_side, number + 1)
+        else:
+            yield from range(1, number + 1)
+        if number < self.num_pages - on_each_side - on_ends - 1:
+            yield from range(number + 1, number + on_each_side + 1)
+            yield self.ELLIPSIS
+            yield from range(self.num_pages - on_ends + 1,
+                             self.num_pages + 1)
+        else:
+            yield from range(number + 1, self.num_pages + 1)
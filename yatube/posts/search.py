@@ -0,0 +1,137 @@
+from django.conf import settings
+from django.db import connection
+from django.utils.html import escape
+from django.utils.module_loading import import_string
+from django.utils.safestring import mark_safe
+
+from .models import Post
+
+FTS_TABLE = 'posts_post_fts'
+MARK_START = '\x02'
+MARK_END = '\x03'
+SNIPPET_TOKENS = 16
+
+
+class IcontainsSearchBackend:
+    """Поиск через LIKE: работает на любой БД, но сканирует всю таблицу."""
+
+    def search(self, keyword, limit):
+        posts = Post.objects.filter(text__icontains=keyword)
+        pks = posts.values_list('pk', flat=True)[:limit]
+        return [(pk, None) for pk in pks]
+
+    def index(self, post):
+        pass
+
+    def index_many(self, post_ids):
+        pass
+
+    def remove(self, post_id):
+        pass
+
+    def rebuild(self, batch_size):
+        return 0
+
+
+class FTS5SearchBackend:
+    """Полнотекстовый поиск по виртуальной таблице SQLite FTS5.
+
+    Таблица создаётся миграцией и синхронизируется сигналами модели Post.
+    Результаты упорядочены по релевантности (bm25) и содержат фрагмент
+    текста с подсвеченными совпадениями.
+    """
+
+    def match_expression(self, keyword):
+        words = ('"{}"*'.format(word.replace('"', '""'))
+                 for word in keyword.split())
+        return ' '.join(words)
+
+    def search(self, keyword, limit):
+        expression = self.match_expression(keyword)
+        if not expression:
+            return []
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT rowid, snippet({FTS_TABLE}, 0, %s, %s, %s, %s) '
+                f'FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s '
+                f'ORDER BY rank LIMIT %s',
+                [MARK_START, MARK_END, '…', SNIPPET_TOKENS, expression, limit]
+            )
+            return [(pk, highlight(snippet))
+                    for pk, snippet in cursor.fetchall()]
+
+    def index(self, post):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s',
+                           [post.pk])
+            cursor.execute(
+                f'INSERT INTO {FTS_TABLE} (rowid, text) VALUES (%s, %s)',
+                [post.pk, post.text]
+            )
+
+    def index_many(self, post_ids):
+        """Переиндексирует посты пакетом, например после bulk_create."""
+        rows = list(Post.objects.filter(pk__in=post_ids).order_by()
+                    .values_list('pk', 'text'))
+        with connection.cursor() as cursor:
+            cursor.executemany(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s',
+                               [(pk,) for pk, _ in rows])
+            self._insert(cursor, rows)
+
+    def remove(self, post_id):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s',
+                           [post_id])
+
+    def rebuild(self, batch_size):
+        rows = Post.objects.order_by().values_list('pk', 'text')
+        total = 0
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE}')
+            batch = []
+            for row in rows.iterator(chunk_size=batch_size):
+                batch.append(row)
+                if len(batch) == batch_size:
+                    total += self._insert(cursor, batch)
+                    batch = []
+            total += self._insert(cursor, batch)
+        return total
+
+    def _insert(self, cursor, batch):
+        if batch:
+            cursor.executemany(
+                f'INSERT INTO {FTS_TABLE} (rowid, text) VALUES (%s, %s)',
+                batch
+            )
+        return len(batch)
+
+
+def highlight(snippet):
+    return mark_safe(escape(snippet)
+                     .replace(MARK_START, '<mark>')
+                     .replace(MARK_END, '</mark>'))
+
+
+def get_backend():
+    if settings.SEARCH_BACKEND:
+        return import_string(settings.SEARCH_BACKEND)()
+    if connection.vendor == 'sqlite':
+        return FTS5SearchBackend()
+    return IcontainsSearchBackend()
+
+
+def find_posts(keyword):
+    """Список (id поста, фрагмент) в порядке релевантности."""
+    return get_backend().search(keyword, settings.SEARCH_RESULTS_LIMIT)
+
+
+def load_posts(hits):
+    """Посты для страницы результатов с подсвеченным фрагментом snippet."""
+    posts = Post.objects.select_related('author', 'group').in_bulk(
+        [pk for pk, _ in hits])
+    results = []
+    for pk, snippet in hits:
+        if pk in posts:
+            posts[pk].snippet = snippet
+            results.append(posts[pk])
+    return results
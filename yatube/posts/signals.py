@@ -0,0 +1,139 @@
+from django.db.models.signals import (post_delete, post_save, pre_delete,
+                                      pre_save)
+from django.dispatch import receiver
+
+from . import cards, counters, feed, pagecache, search
+from .models import Comment, Follow, Group, Post, User
+
+CARD_USER_FIELDS = {'username', 'first_name', 'last_name'}
+
+
+@receiver(post_save, sender=Post)
+def index_post(sender, instance, **kwargs):
+    search.get_backend().index(instance)
+
+
+@receiver(post_delete, sender=Post)
+def unindex_post(sender, instance, **kwargs):
+    search.get_backend().remove(instance.pk)
+
+
+@receiver(post_save, sender=Post)
+def sync_feed_entry(sender, instance, **kwargs):
+    feed.sync_post(instance)
+
+
+@receiver(post_save, sender=Group)
+@receiver(pre_delete, sender=Group)
+def sync_feed_group(sender, instance, created=False, signal=None, **kwargs):
+    if not created:
+        feed.sync_group(instance, deleted=signal is pre_delete)
+
+
+@receiver(post_save, sender=User)
+def sync_feed_author(sender, instance, created, update_fields, **kwargs):
+    if created or (update_fields and not CARD_USER_FIELDS & update_fields):
+        return
+    feed.sync_author(instance)
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def invalidate_post_card(sender, instance, **kwargs):
+    cards.invalidate([(instance.pk, instance.pub_date)])
+
+
+@receiver(post_save, sender=Group)
+@receiver(pre_delete, sender=Group)
+def invalidate_group_cards(sender, instance, created=False, **kwargs):
+    if not created:
+        cards.invalidate(instance.posts.values_list('pk', 'pub_date'))
+
+
+@receiver(post_save, sender=User)
+def invalidate_author_cards(sender, instance, created, update_fields,
+                            **kwargs):
+    if created or (update_fields and not CARD_USER_FIELDS & update_fields):
+        return
+    cards.invalidate(instance.posts.values_list('pk', 'pub_date'))
+
+
+@receiver(post_save, sender=Post)
+def increment_author_posts(sender, instance, created, **kwargs):
+    if created:
+        counters.change(instance.author_id, 'posts')
+
+
+@receiver(post_delete, sender=Post)
+def decrement_author_posts(sender, instance, **kwargs):
+    counters.change(instance.author_id, 'posts', -1)
+
+
+def change_post_comments(post_id, delta):
+    counters.change_comments(post_id, delta)
+    cards.invalidate(Post.objects.filter(pk=post_id)
+                     .values_list('pk', 'pub_date'))
+
+
+@receiver(post_save, sender=Comment)
+def increment_post_comments(sender, instance, created, **kwargs):
+    if created:
+        change_post_comments(instance.post_id, 1)
+
+
+@receiver(post_delete, sender=Comment)
+def decrement_post_comments(sender, instance, **kwargs):
+    """Удаление комментария, в том числе каскадное, уменьшает счётчик."""
+    change_post_comments(instance.post_id, -1)
+
+
+def post_page_tags(post_id, author_id, *group_ids):
+    tags = ['index', f'post:{post_id}', f'author:{author_id}']
+    tags.extend(f'group:{pk}' for pk in set(group_ids) if pk)
+    return tags
+
+
+@receiver(pre_save, sender=Post)
+def remember_post_group(sender, instance, **kwargs):
+    if instance.pk:
+        instance._previous_group_id = (
+            Post.objects.filter(pk=instance.pk)
+            .values_list('group_id', flat=True).first())
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def purge_post_pages(sender, instance, **kwargs):
+    previous = getattr(instance, '_previous_group_id', None)
+    pagecache.purge(*post_page_tags(instance.pk, instance.author_id,
+                                    instance.group_id, previous))
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def purge_comment_pages(sender, instance, **kwargs):
+    post = (Post.objects.filter(pk=instance.post_id)
+            .values_list('author_id', 'group_id').first())
+    if post:
+        pagecache.purge(*post_page_tags(instance.post_id, *post))
+
+
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+def purge_follow_pages(sender, instance, **kwargs):
+    pagecache.purge(f'author:{instance.author_id}',
+                    f'author:{instance.user_id}')
+
+
+@receiver(post_save, sender=Group)
+@receiver(pre_delete, sender=Group)
+def purge_group_pages(sender, instance, created=False, **kwargs):
+    if not created:
+        pagecache.purge(pagecache.SITE_TAG)
+
+
+@receiver(post_save, sender=User)
+def purge_author_pages(sender, instance, created, update_fields, **kwargs):
+    if created or (update_fields and not CARD_USER_FIELDS & update_fields):
+        return
+    pagecache.purge(pagecache.SITE_TAG)
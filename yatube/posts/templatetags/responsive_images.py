@@ -0,0 +1,37 @@
+import logging
+
+from django import template
+from django.utils.html import format_html
+
+from posts import thumbnails
+
+logger = logging.getLogger(__name__)
+register = template.Library()
+
+# Ширина картинки на странице: колонка контейнера Bootstrap или экран.
+SIZES = '(min-width: 992px) 960px, 100vw'
+
+
+@register.simple_tag
+def responsive_image(image, placeholder='', src='', srcset='', lazy=True):
+    """<img> с srcset миниатюр POST_THUMBNAILS и заглушкой на фоне.
+
+    Готовые src и srcset берутся из FeedEntry, для поста их вычисляет
+    sorl. Ширина и высота в разметке резервируют место под картинку.
+    """
+    if not image:
+        return ''
+    if not srcset:
+        try:
+            src, srcset = thumbnails.renditions(image)
+        except Exception:
+            logger.exception('Не удалось получить миниатюры %s', image)
+            return ''
+    width, height = thumbnails.largest_size()
+    style = (format_html(' style="background: center / cover url({})"',
+                         placeholder) if placeholder else '')
+    return format_html(
+        '<img class="card-img my-2" src="{}" srcset="{}" sizes="{}" '
+        'width="{}" height="{}" loading="{}" decoding="async" alt=""{}>',
+        src, srcset, SIZES, width, height, 'lazy' if lazy else 'eager',
+        style)
@@ -0,0 +1,88 @@
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..models import Comment, Follow, Group, Post, User
+
+
+class ApiTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='Author')
+        cls.reader = User.objects.create_user(username='Reader')
+        cls.group = Group.objects.create(title='Группа', slug='group')
+        for number in range(12):
+            Post.objects.create(author=cls.author, group=cls.group,
+                                text=f'Пост {number}')
+        cls.post = Post.objects.first()
+        Comment.objects.create(post=cls.post, author=cls.reader,
+                               text='Комментарий')
+        Post.objects.filter(pk=cls.post.pk).update(comments_count=1)
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def test_feed_cursor_paging(self):
+        """Лента отдаётся страницами по курсору без повторов"""
+
+        response = self.client.get(reverse('api:index'))
+        self.assertEqual(response['Content-Type'],
+                         'application/json; charset=utf-8')
+        first = response.json()
+        self.assertEqual(len(first['results']), 10)
+        self.assertEqual(first['results'][0], {
+            'id': self.post.pk,
+            'text': self.post.text,
+            'pub_date': self.post.pub_date.isoformat(),
+            'image': '',
+            'comments_count': 1,
+            'username': 'Author',
+            'group_slug': 'group',
+        })
+        second = self.client.get(reverse('api:index'),
+                                 {'cursor': first['next']}).json()
+        self.assertEqual(len(second['results']), 2)
+        self.assertIsNone(second['next'])
+        ids = {row['id'] for row in first['results'] + second['results']}
+        self.assertEqual(len(ids), 12)
+
+    def test_endpoints(self):
+        """Группа, профиль, пост и подписки отдают ожидаемые данные"""
+
+        group = self.client.get(
+            reverse('api:group_posts', args=(self.group.slug,))).json()
+        self.assertEqual(group['group']['title'], self.group.title)
+        profile = self.client.get(
+            reverse('api:profile', args=(self.author,))).json()
+        self.assertEqual(
+            (profile['author']['posts'], profile['author']['followers']),
+            (12, 1))
+        detail = self.client.get(
+            reverse('api:post_detail', args=(self.post.pk,))).json()
+        self.assertEqual(detail['post']['id'], self.post.pk)
+        self.assertEqual(detail['comments']['results'][0]['username'],
+                         'Reader')
+        follow = self.reader_client.get(reverse('api:follow_index')).json()
+        self.assertEqual(len(follow['results']), 10)
+
+    def test_errors(self):
+        """Ошибки возвращаются в JSON"""
+
+        self.assertEqual(
+            self.client.get(reverse('api:follow_index')).status_code, 401)
+        response = self.client.get(
+            reverse('api:post_detail', args=(self.post.pk + 100,)))
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(response.json(), {'detail': 'Не найдено'})
+
+    def test_feed_query_count(self):
+        """Страница ленты — один запрос к постам"""
+
+        url = reverse('api:index')
+        self.client.get(url)
+        with self.assertNumQueries(1):
+            self.client.get(url)
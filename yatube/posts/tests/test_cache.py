@@ -0,0 +1,90 @@
+import os
+import shutil
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.test import SimpleTestCase
+
+from core.cache import SQLiteCache
+
+
+class SQLiteCacheTests(SimpleTestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'cache.sqlite3')
+        self.cache = self.make_cache()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def make_cache(self, **options):
+        return SQLiteCache(self.path, {'OPTIONS': options})
+
+    def test_shared_between_instances(self):
+        """Записи и удаления видны другим экземплярам (процессам)"""
+
+        other = self.make_cache()
+        self.cache.set('key', {'value': 1})
+        self.assertEqual(other.get('key'), {'value': 1})
+        other.delete('key')
+        self.assertIsNone(self.cache.get('key'))
+
+    def test_add_timeout_and_versions(self):
+        """add, истечение срока и версии ключей работают как в Django"""
+
+        self.assertTrue(self.cache.add('key', 1))
+        self.assertFalse(self.cache.add('key', 2))
+        self.cache.set('expired', 1, timeout=-1)
+        self.assertFalse(self.cache.has_key('expired'))
+        self.assertTrue(self.cache.add('expired', 2))
+        self.cache.set('versioned', 'old', version=1)
+        self.cache.set('versioned', 'new', version=2)
+        self.assertEqual(self.cache.get('versioned', version=1), 'old')
+        self.assertEqual(self.cache.get_many(['key', 'expired', 'missing']),
+                         {'key': 1, 'expired': 2})
+
+    def test_incr_is_atomic(self):
+        """incr из нескольких потоков не теряет обновлений"""
+
+        self.cache.set('counter', 0)
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            list(executor.map(lambda _: self.cache.incr('counter'),
+                              range(100)))
+        self.assertEqual(self.cache.get('counter'), 100)
+        with self.assertRaises(ValueError):
+            self.cache.incr('missing')
+
+    def test_incr_many(self):
+        """incr_many увеличивает и создаёт счётчики одной транзакцией"""
+
+        self.cache.set('counter', 5)
+        self.assertEqual(self.cache.incr_many({'counter': 2, 'new': 3}),
+                         {'counter': 7, 'new': 3})
+        self.assertEqual(self.cache.get_many(['counter', 'new']),
+                         {'counter': 7, 'new': 3})
+
+    def test_update_many_is_atomic(self):
+        """update_many из нескольких потоков не теряет изменений"""
+
+        self.cache.set('list', [])
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            list(executor.map(
+                lambda number: self.cache.update_many(
+                    ['list', 'missing'], lambda value: value + [number]),
+                range(50)))
+        self.assertEqual(sorted(self.cache.get('list')), list(range(50)))
+        self.assertFalse(self.cache.has_key('missing'))
+
+    def test_lru_eviction(self):
+        """При переполнении вытесняются давно не читанные ключи"""
+
+        cache = self.make_cache(MAX_ENTRIES=10, CULL_FREQUENCY=2)
+        for number in range(10):
+            cache.set(f'key{number}', number)
+        time.sleep(1.1)
+        cache.get('key0')
+        cache.set('key10', 10)
+        self.assertEqual(cache.get('key0'), 0)
+        self.assertIsNone(cache.get('key1'))
+        self.assertEqual(cache.get('key10'), 10)
@@ -1,7 +1,12 @@
+import os
 import shutil
 import tempfile
+from io import StringIO
 
 from django.conf import settings
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.core.management import call_command
 from posts.models import Post
 from django.test import Client, TestCase, override_settings
 from django.urls import reverse
@@ -121,3 +126,36 @@ class PostFormTests(TestCase):
             posts_count,
             'Появился новый пост, такого быть не должно'
         )
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ThumbnailTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def tearDown(self):
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def test_generate_thumbnails_command(self):
+        """Команда generate_thumbnails создаёт миниатюры картинок постов"""
+
+        default_storage.save('posts/small.gif',
+                             SimpleUploadedFile('small.gif', SMALL_GIF))
+        call_command('generate_thumbnails', processes=1, stdout=StringIO())
+        thumbnails = [
+            name for _, _, names in os.walk(
+                os.path.join(TEMP_MEDIA_ROOT, 'cache'))
+            for name in names
+        ]
+        self.assertEqual(len(thumbnails), len(settings.POST_THUMBNAILS))
+
+    def test_generate_thumbnails_logs_failures(self):
+        """Причина ошибки генерации миниатюры попадает в лог"""
+
+        default_storage.save('posts/broken.gif',
+                             SimpleUploadedFile('broken.gif', b'not a gif'))
+        with self.assertLogs('posts.management.commands.generate_thumbnails',
+                             'ERROR') as logs:
+            call_command('generate_thumbnails', processes=1,
+                         stdout=StringIO())
+        self.assertIn('posts/broken.gif', logs.output[0])
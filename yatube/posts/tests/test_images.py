@@ -0,0 +1,149 @@
+import base64
+import shutil
+import tempfile
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.template import Context, Template
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+
+from .. import images
+from ..forms import PostForm
+from ..models import FeedEntry, Post, User
+from .test_constants import CREATE_URL, SMALL_GIF, USERNAME
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+ORIENTATION = 0x0112
+
+
+def truncated(size):
+    """JPEG, обрезанный на середине: заголовок цел, данные нет."""
+    buffer = BytesIO()
+    Image.effect_noise(size, 64).convert('RGB').save(buffer, 'JPEG')
+    data = buffer.getvalue()
+    return SimpleUploadedFile('cut.jpg', data[:len(data) // 2], 'image/jpeg')
+
+
+def photo(size, orientation=None):
+    image = Image.new('RGB', size, (200, 30, 30))
+    exif = Image.Exif()
+    if orientation:
+        exif[ORIENTATION] = orientation
+    buffer = BytesIO()
+    image.save(buffer, 'JPEG', exif=exif.tobytes())
+    return SimpleUploadedFile('photo.JPG', buffer.getvalue(), 'image/jpeg')
+
+
+@override_settings(IMAGE_MAX_SIDE=100)
+class NormalizeTests(SimpleTestCase):
+    def test_large_photo_reencoded(self):
+        """Большое фото уменьшается, поворачивается по EXIF и теряет EXIF"""
+
+        upload, report = images.normalize(photo((400, 200), orientation=6))
+        with Image.open(upload) as image:
+            self.assertEqual(image.size, (50, 100))
+            self.assertFalse(image.getexif())
+        self.assertEqual(report['stored'], upload.size)
+        self.assertLess(report['stored'], report['original'])
+
+    def test_small_clean_images_kept(self):
+        """GIF и небольшие картинки без EXIF не перекодируются"""
+
+        gif = SimpleUploadedFile('small.gif', SMALL_GIF, 'image/gif')
+        upload, report = images.normalize(gif)
+        self.assertIs(upload, gif)
+        self.assertEqual(report['stored'], report['original'])
+        clean = photo((80, 60))
+        self.assertIs(images.normalize(clean)[0], clean)
+
+    def test_placeholder(self):
+        """Заглушка — data URI картинки размера POST_PLACEHOLDER_SIZE"""
+
+        value = images.placeholder(photo((400, 200)))
+        prefix = 'data:image/jpeg;base64,'
+        self.assertTrue(value.startswith(prefix))
+        data = base64.b64decode(value[len(prefix):])
+        with Image.open(BytesIO(data)) as image:
+            self.assertEqual(image.size, settings.POST_PLACEHOLDER_SIZE)
+
+    def test_responsive_image_tag(self):
+        """Тег выводит готовые src, srcset, ленивую загрузку и заглушку"""
+
+        html = Template(
+            '{% load responsive_images %}'
+            '{% responsive_image "posts/a.jpg" "data:x" "/b.jpg" srcset %}'
+        ).render(Context({'srcset': '/a.jpg 320w, /b.jpg 960w'}))
+        self.assertIn('src="/b.jpg"', html)
+        self.assertIn('srcset="/a.jpg 320w, /b.jpg 960w"', html)
+        self.assertIn('loading="lazy"', html)
+        self.assertIn('url(data:x)', html)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class UploadTests(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        self.user = User.objects.create_user(username=USERNAME)
+        self.client.force_login(self.user)
+
+    @override_settings(IMAGE_MAX_SIDE=100)
+    def test_upload_normalized(self):
+        """Новый пост сохраняет уменьшенную картинку без EXIF"""
+
+        self.client.post(CREATE_URL, {'text': 'Фото',
+                                      'image': photo((400, 200), 1)})
+        post = Post.objects.get()
+        self.assertFalse(post.image.name.endswith('.JPG'))
+        with Image.open(post.image.path) as image:
+            self.assertEqual(image.size, (100, 50))
+            self.assertFalse(image.getexif())
+        self.assertTrue(post.placeholder.startswith('data:image/jpeg'))
+
+    def test_renditions_in_feed_and_detail(self):
+        """Миниатюры всех ширин попадают в FeedEntry и страницу поста"""
+
+        self.client.post(CREATE_URL, {'text': 'Фото',
+                                      'image': photo((400, 200))})
+        post = Post.objects.get()
+        entry = FeedEntry.objects.get(pk=post.pk)
+        self.assertEqual(entry.placeholder, post.placeholder)
+        self.assertEqual(entry.thumbnail_srcset.count('w'),
+                         len(settings.POST_THUMBNAILS))
+        response = self.client.get(
+            reverse('posts:post_detail', kwargs={'post_id': post.pk}))
+        self.assertContains(response, '320w')
+        self.assertContains(response, 'loading="eager"')
+
+    @override_settings(IMAGE_MAX_SIDE=100)
+    def test_truncated_large_rejected(self):
+        """Обрезанная большая картинка — ошибка формы, а не 500"""
+
+        response = self.client.post(CREATE_URL, {
+            'text': 'Фото', 'image': truncated((400, 200))})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.context['form'].errors['image'])
+        self.assertFalse(Post.objects.exists())
+
+    def test_truncated_small_rejected(self):
+        """Обрезанная картинка, которую normalize() не трогает, отклоняется"""
+
+        response = self.client.post(CREATE_URL, {
+            'text': 'Фото', 'image': truncated((500, 400))})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.context['form'].errors['image'])
+        self.assertFalse(Post.objects.exists())
+
+    @override_settings(IMAGE_MAX_PIXELS=100)
+    def test_oversized_rejected(self):
+        """Картинка больше IMAGE_MAX_PIXELS отклоняется формой"""
+
+        form = PostForm({'text': 'Фото'}, {'image': photo((20, 20))})
+        self.assertFalse(form.is_valid())
+        self.assertIn('image', form.errors)
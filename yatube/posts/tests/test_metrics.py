@@ -0,0 +1,71 @@
+import time
+
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from core import metrics
+from ..models import Post, User
+
+
+@override_settings(METRICS_FLUSH_INTERVAL=0, METRICS_TOKEN='secret')
+class MetricsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='Author')
+        Post.objects.create(author=cls.author, text='Пост')
+
+    def setUp(self):
+        metrics.histograms.flush()
+        cache.clear()
+
+    def test_server_timing_header(self):
+        """Ответ сообщает время SQL, шаблонов и общее"""
+
+        header = self.client.get(reverse('posts:index'))['Server-Timing']
+        names = [part.split(';')[0] for part in header.split(', ')]
+        self.assertEqual(names, ['total', 'sql', 'template'])
+
+    def test_nested_blocks_counted_once(self):
+        """Вложенный блок метрики входит во внешний и не удваивает её"""
+
+        with metrics.collect() as timings:
+            with metrics.timed('template'):
+                with metrics.timed('template'):
+                    time.sleep(0.05)
+            with metrics.timed('sql'):
+                pass
+        self.assertEqual(timings.counts['template'], 1)
+        self.assertLess(timings.seconds['template'], 0.09)
+        self.assertEqual(timings.counts['sql'], 1)
+
+    def test_prometheus_endpoint(self):
+        """Гистограммы маршрутов posts: доступны по /metrics/"""
+
+        self.client.get(reverse('posts:index'))
+        self.client.get(reverse('posts:index'))
+        self.client.get(reverse('about:author'))
+        body = self.client.get(
+            reverse('metrics'),
+            HTTP_AUTHORIZATION='Bearer secret').content.decode()
+        self.assertIn('# TYPE yatube_total_seconds histogram', body)
+        self.assertIn(
+            'yatube_total_seconds_bucket{route="posts:index",le="+Inf"} 2',
+            body)
+        self.assertIn('yatube_sql_seconds_count{route="posts:index"} 2',
+                      body)
+        self.assertNotIn('about:', body)
+
+    def test_endpoint_requires_token(self):
+        """Без токена метрики не показываются даже локальным адресам"""
+
+        client = Client(REMOTE_ADDR='127.0.0.1')
+        self.assertEqual(client.get(reverse('metrics')).status_code, 404)
+        response = client.get(reverse('metrics'),
+                              HTTP_AUTHORIZATION='Bearer wrong')
+        self.assertEqual(response.status_code, 404)
+        with self.settings(METRICS_TOKEN=''):
+            response = client.get(reverse('metrics'),
+                                  HTTP_AUTHORIZATION='Bearer ')
+            self.assertEqual(response.status_code, 404)
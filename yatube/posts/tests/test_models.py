@@ -1,7 +1,8 @@
 from django.contrib.auth import get_user_model
+from django.db import IntegrityError
 from django.test import TestCase
 
-from posts.models import Group, Post
+from posts.models import Follow, Group, Post
 
 
 User = get_user_model()
@@ -39,3 +40,11 @@ class PostModelTest(TestCase):
                     expected,
                     f'Ошибка __str__ у {field}'
                 )
+
+    def test_follow_is_unique(self):
+        """Повторная подписка на того же автора запрещена в БД."""
+
+        reader = User.objects.create_user(username='reader')
+        Follow.objects.create(user=reader, author=PostModelTest.user)
+        with self.assertRaises(IntegrityError):
+            Follow.objects.create(user=reader, author=PostModelTest.user)
@@ -0,0 +1,53 @@
+from datetime import timedelta
+
+from django.core import mail
+from django.test import Client, TestCase, override_settings
+from django.utils import timezone
+
+from core import tasks
+from core.models import Task
+from .. import notifications
+from ..models import Follow, Notification, Post, User
+from .test_constants import CREATE_URL
+
+
+@override_settings(TASKS_EAGER=False, NOTIFICATION_DIGEST_DELAY=60)
+class NotificationTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='Author')
+        cls.reader = User.objects.create_user(username='Reader',
+                                              email='reader@example.com')
+        cls.silent = User.objects.create_user(username='Silent')
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        Follow.objects.create(user=cls.silent, author=cls.author)
+
+    def test_digest_collects_posts(self):
+        """Несколько постов уходят подписчику одним письмом"""
+
+        first = Post.objects.create(author=self.author, text='Первый пост')
+        second = Post.objects.create(author=self.author, text='Второй пост')
+        self.assertEqual(notifications.notify_followers(first.pk), 1)
+        self.assertEqual(notifications.notify_followers(second.pk), 1)
+        self.assertEqual(notifications.send_digests(), 1)
+        self.assertEqual(len(mail.outbox), 1)
+        message = mail.outbox[0]
+        self.assertEqual(message.to, ['reader@example.com'])
+        self.assertIn('Первый пост', message.body)
+        self.assertIn(f'/posts/{second.pk}/', message.body)
+        self.assertFalse(Notification.objects.exists())
+
+    def test_post_create_schedules_delivery(self):
+        """Публикация ставит задачу, дайджест откладывается"""
+
+        client = Client()
+        client.force_login(self.author)
+        client.post(CREATE_URL, {'text': 'Новый пост'})
+        self.assertEqual(mail.outbox, [])
+        tasks.work(burst=True)
+        digest = Task.objects.get(name='posts.notifications.send_digests')
+        self.assertEqual(digest.status, Task.QUEUED)
+        self.assertGreater(digest.run_at,
+                           timezone.now() + timedelta(seconds=30))
+        self.assertEqual(Notification.objects.get().user, self.reader)
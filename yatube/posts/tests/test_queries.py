@@ -0,0 +1,69 @@
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from core.middleware import QueryBudgetExceeded
+from core.queries import assert_query_budget, fingerprint
+from ..models import Comment, Follow, Group, Post, User
+
+
+class QueryBudgetTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='Author')
+        cls.reader = User.objects.create_user(username='Reader')
+        cls.group = Group.objects.create(title='Группа', slug='group')
+        cls.post = Post.objects.create(author=cls.author, group=cls.group,
+                                       text='Пост')
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        Comment.objects.bulk_create(
+            [Comment(post=cls.post, author=User.objects.create_user(
+                username=f'Commenter{number}'), text='Комментарий')
+             for number in range(10)])
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def test_fingerprint(self):
+        """Запросы, отличающиеся литералами, имеют один отпечаток"""
+
+        self.assertEqual(
+            fingerprint("SELECT * FROM t WHERE id = 1 AND name = 'a'"),
+            fingerprint("SELECT  * FROM t WHERE id = 25 AND name = 'b''c'"))
+        self.assertEqual(fingerprint('SELECT * FROM t WHERE id IN (1, 2)'),
+                         fingerprint('SELECT * FROM t WHERE id IN (%s)'))
+
+    def test_n_plus_one_detected(self):
+        """Повторяющийся запрос в цикле определяется как N+1"""
+
+        with self.assertRaisesMessage(AssertionError, 'N+1: 10 раз'):
+            with assert_query_budget(100):
+                for comment in Comment.objects.all():
+                    comment.author.username
+
+    @override_settings(QUERY_BUDGET_ENABLED=True, QUERY_BUDGET_RAISE=True)
+    def test_views_within_budget(self):
+        """Страницы укладываются в бюджет запросов и не содержат N+1"""
+
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:group_list', args=(self.group.slug,)),
+            reverse('posts:profile', args=(self.author,)),
+            reverse('posts:post_detail', args=(self.post.pk,)),
+            reverse('posts:follow_index'),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                self.assertEqual(self.client.get(url).status_code, 200)
+
+    @override_settings(QUERY_BUDGET_ENABLED=True, QUERY_BUDGET_RAISE=True,
+                       QUERY_BUDGETS={'posts:post_detail': 1})
+    def test_budget_exceeded(self):
+        """Превышение бюджета маршрута приводит к ошибке"""
+
+        with self.assertRaisesMessage(QueryBudgetExceeded, 'бюджет 1'):
+            self.client.get(reverse('posts:post_detail',
+                                    args=(self.post.pk,)))
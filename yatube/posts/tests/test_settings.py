@@ -0,0 +1,29 @@
+import os
+import subprocess
+import sys
+
+from django.conf import settings
+from django.test import SimpleTestCase
+
+SETUP_CODE = 'import django; django.setup()'
+
+
+class ProductionProfileTests(SimpleTestCase):
+    def run_setup(self, **env):
+        environ = {key: value for key, value in os.environ.items()
+                   if key != 'YATUBE_SECRET_KEY'}
+        return subprocess.run(
+            [sys.executable, '-c', SETUP_CODE],
+            env={**environ, 'DJANGO_SETTINGS_MODULE': 'yatube.settings',
+                 **env},
+            cwd=settings.BASE_DIR, capture_output=True, text=True)
+
+    def test_production_requires_secret_key(self):
+        """Профиль production без YATUBE_SECRET_KEY не запускается"""
+
+        result = self.run_setup(YATUBE_PROFILE='production')
+        self.assertNotEqual(result.returncode, 0)
+        self.assertIn('YATUBE_SECRET_KEY', result.stderr)
+        result = self.run_setup(YATUBE_PROFILE='production',
+                                YATUBE_SECRET_KEY='secret')
+        self.assertEqual(result.returncode, 0, result.stderr)
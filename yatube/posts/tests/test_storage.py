@@ -0,0 +1,126 @@
+import gzip
+import hashlib
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase
+
+from core.storage import (CompressedManifestStaticFilesStorage,
+                          ContentAddressedStorage)
+from posts.models import FeedEntry, Post
+
+User = get_user_model()
+
+
+class CompressedStaticTests(SimpleTestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.storage = CompressedManifestStaticFilesStorage(
+            location=self.directory)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def test_compressed_copies(self):
+        """Крупные текстовые файлы получают копию .gz, мелкие — нет"""
+
+        css = b'body { color: black; }\n' * 100
+        self.storage.save('site.css', ContentFile(css))
+        self.storage.save('tiny.css', ContentFile(b'a {}'))
+        self.storage.compress('site.css')
+        self.storage.compress('tiny.css')
+        with self.storage.open('site.css.gz') as file:
+            self.assertEqual(gzip.decompress(file.read()), css)
+        self.assertFalse(self.storage.exists('tiny.css.gz'))
+
+
+class ContentAddressedStorageTests(SimpleTestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.storage = ContentAddressedStorage(location=self.directory)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def test_same_content_stored_once(self):
+        """Одинаковые загрузки получают одно имя по хешу и один файл"""
+
+        digest = hashlib.sha256(b'picture').hexdigest()
+        first = self.storage.save('posts/one.GIF', ContentFile(b'picture'))
+        second = self.storage.save('posts/two.gif', ContentFile(b'picture'))
+        self.assertEqual(first, f'posts/{digest[:2]}/{digest[2:4]}/'
+                                f'{digest}.gif')
+        self.assertEqual(first, second)
+        self.assertEqual(os.listdir(os.path.dirname(
+            self.storage.path(first))), [f'{digest}.gif'])
+        self.assertEqual(os.listdir(self.storage.path('.incoming')), [])
+
+    def test_file_mode_follows_umask(self):
+        """Файл доступен на чтение как у FileSystemStorage, а не 0600"""
+
+        umask = os.umask(0o022)
+        try:
+            self.storage = ContentAddressedStorage(location=self.directory)
+            name = self.storage.save('posts/a.gif', ContentFile(b'picture'))
+            plain = FileSystemStorage(location=self.directory).save(
+                'plain.gif', ContentFile(b'picture'))
+        finally:
+            os.umask(umask)
+        mode = os.stat(self.storage.path(name)).st_mode & 0o777
+        self.assertEqual(mode, 0o644)
+        self.assertEqual(
+            mode, os.stat(os.path.join(self.directory, plain)).st_mode & 0o777)
+        with self.settings(FILE_UPLOAD_PERMISSIONS=0o640):
+            name = ContentAddressedStorage(location=self.directory).save(
+                'posts/b.gif', ContentFile(b'other'))
+        self.assertEqual(os.stat(self.storage.path(name)).st_mode & 0o777,
+                         0o640)
+
+    def test_different_content_different_names(self):
+        """Разное содержимое с одним исходным именем не перезаписывается"""
+
+        first = self.storage.save('posts/a.gif', ContentFile(b'first'))
+        second = self.storage.save('posts/a.gif', ContentFile(b'second'))
+        self.assertNotEqual(first, second)
+        with self.storage.open(first) as file:
+            self.assertEqual(file.read(), b'first')
+
+
+class MigrateMediaTests(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.settings_override = self.settings(MEDIA_ROOT=self.directory)
+        self.settings_override.enable()
+        source = FileSystemStorage(location=self.directory)
+        source.save('posts/old.gif', ContentFile(b'picture'))
+        user = User.objects.create_user(username='author')
+        self.posts = [
+            Post.objects.create(author=user, text=f'Пост {number}',
+                                image='posts/old.gif')
+            for number in range(2)
+        ]
+
+    def tearDown(self):
+        self.settings_override.disable()
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def test_migrate_media(self):
+        """Команда переносит картинки постов и удаляет старые файлы"""
+
+        digest = hashlib.sha256(b'picture').hexdigest()
+        name = f'posts/{digest[:2]}/{digest[2:4]}/{digest}.gif'
+        call_command('migrate_media', '--workers=2', '--delete',
+                     stdout=StringIO())
+        for post in self.posts:
+            post.refresh_from_db()
+            self.assertEqual(post.image.name, name)
+            self.assertEqual(FeedEntry.objects.get(pk=post.pk).image, name)
+        self.assertTrue(os.path.exists(os.path.join(self.directory, name)))
+        self.assertFalse(os.path.exists(
+            os.path.join(self.directory, 'posts/old.gif')))
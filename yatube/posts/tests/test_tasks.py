@@ -0,0 +1,113 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.utils import timezone
+
+from core import tasks
+from core.models import Task
+from ..models import User
+from .test_constants import CREATE_URL
+
+CALLS = []
+
+
+@tasks.task()
+def record(value):
+    CALLS.append(value)
+
+
+@tasks.task(priority=5)
+def record_urgent(value):
+    CALLS.append(value)
+
+
+@tasks.task(max_attempts=2)
+def fail(value):
+    raise RuntimeError(value)
+
+
+def not_a_task():
+    pass
+
+
+@override_settings(TASKS_EAGER=False, TASK_RETRY_DELAY=0)
+class TaskQueueTests(TestCase):
+    def setUp(self):
+        CALLS.clear()
+
+    def test_tasks_run_by_priority(self):
+        """Воркер выполняет задачи по приоритету, затем по порядку"""
+
+        record.delay('первая')
+        record.delay('вторая')
+        record_urgent.delay('срочная')
+        self.assertEqual(CALLS, [])
+        self.assertEqual(tasks.work(burst=True), 3)
+        self.assertEqual(CALLS, ['срочная', 'первая', 'вторая'])
+        self.assertEqual(Task.objects.filter(status=Task.DONE).count(), 3)
+
+    def test_retries_and_failure(self):
+        """Ошибка повторяется до max_attempts, затем задача помечается"""
+
+        fail.delay('сбой')
+        tasks.work(burst=True)
+        task = Task.objects.get()
+        self.assertEqual((task.status, task.attempts), (Task.FAILED, 2))
+        self.assertIn('RuntimeError: сбой', task.error)
+
+    def test_only_declared_tasks_run(self):
+        """Функции без декоратора task не выполняются воркером"""
+
+        Task.objects.create(name=f'{__name__}.not_a_task', max_attempts=1)
+        tasks.work(burst=True)
+        self.assertEqual(Task.objects.get().status, Task.FAILED)
+
+    def test_stale_tasks_failed_after_last_attempt(self):
+        """Зависшая задача с исчерпанными попытками не возвращается"""
+
+        started = timezone.now() - timedelta(days=1)
+        Task.objects.create(name=f'{__name__}.record', status=Task.RUNNING,
+                            started=started, attempts=1, max_attempts=2)
+        Task.objects.create(name=f'{__name__}.record', status=Task.RUNNING,
+                            started=started, attempts=2, max_attempts=2)
+        self.assertEqual(tasks.requeue_stale(), 1)
+        self.assertEqual(
+            list(Task.objects.order_by('pk').values_list('status',
+                                                         flat=True)),
+            [Task.QUEUED, Task.FAILED])
+
+    def test_prune_old_done_tasks(self):
+        """Старые выполненные задачи удаляются, ошибки и свежие остаются"""
+
+        old = timezone.now() - timedelta(days=30)
+        for status, finished in ((Task.DONE, old), (Task.FAILED, old),
+                                 (Task.DONE, timezone.now())):
+            Task.objects.create(name=f'{__name__}.record', status=status,
+                                finished=finished)
+        out = StringIO()
+        call_command('run_tasks', prune=7, stdout=out)
+        self.assertIn('Удалено задач: 1', out.getvalue())
+        self.assertEqual(
+            sorted(Task.objects.values_list('status', flat=True)),
+            [Task.DONE, Task.FAILED])
+
+    def test_post_create_returns_before_side_effects(self):
+        """Миниатюры, лента и уведомления — задачи после ответа"""
+
+        user = User.objects.create_user(username='Author')
+        client = Client()
+        client.force_login(user)
+        with self.settings(
+                TIMELINE_BACKEND='posts.timeline.DatabaseTimeline'):
+            client.post(CREATE_URL, {'text': 'Пост'})
+        self.assertEqual(
+            list(Task.objects.order_by('name').values_list('name', 'status')),
+            [('posts.notifications.notify_followers', Task.QUEUED),
+             ('posts.timeline.fan_out_post', Task.QUEUED)])
+        call_command('run_tasks', burst=True, stdout=StringIO())
+        out = StringIO()
+        call_command('run_tasks', stats=True, stdout=out)
+        self.assertIn('posts.timeline.fan_out_post', out.getvalue())
+        self.assertFalse(Task.objects.exclude(status=Task.DONE).exists())
@@ -0,0 +1,115 @@
+import json
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.conf import settings
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from ..models import (Comment, FeedEntry, Follow, Group, Post, User,
+                      UserCounter)
+from ..search import find_posts
+from .test_constants import SMALL_GIF
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class TransferTests(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def path(self, name):
+        return os.path.join(self.directory, name)
+
+    def write(self, name, rows):
+        with open(self.path(name), 'w', encoding='utf-8') as file:
+            for row in rows:
+                file.write(json.dumps(row, ensure_ascii=False) + '\n')
+        return self.path(name)
+
+    def test_import_posts_comments_follows(self):
+        """Импорт создаёт авторов и группы, сохраняет id и даты"""
+
+        with open(self.path('small.gif'), 'wb') as file:
+            file.write(SMALL_GIF)
+        posts = self.write('posts.ndjson', [
+            {'id': 7, 'author': 'writer', 'group': 'news',
+             'text': 'Импортированный пост',
+             'pub_date': '2020-01-02T03:04:05+00:00', 'image': 'small.gif'},
+            {'id': 8, 'author': 'reader', 'group': None,
+             'text': 'Второй пост', 'pub_date': '2020-01-03T00:00:00'},
+        ])
+        comments = self.write('comments.ndjson', [
+            {'id': 3, 'post': 7, 'author': 'reader', 'text': 'Комментарий',
+             'created': '2020-01-04T00:00:00+00:00'},
+        ])
+        with open(self.path('follows.csv'), 'w', encoding='utf-8') as file:
+            file.write('user,author\nreader,writer\nreader,writer\n')
+        options = {'stdout': StringIO(), 'batch_size': 1}
+        call_command('import_posts', 'posts', posts,
+                     media_root=self.directory, **options)
+        call_command('import_posts', 'comments', comments, **options)
+        call_command('import_posts', 'follows', self.path('follows.csv'),
+                     **options)
+        post = Post.objects.get(pk=7)
+        self.assertEqual(post.author.username, 'writer')
+        self.assertEqual(post.group, Group.objects.get(slug='news'))
+        self.assertEqual(post.pub_date.year, 2020)
+        self.assertEqual(post.image.name, 'posts/small.gif')
+        self.assertTrue(os.path.exists(post.image.path))
+        self.assertEqual(post.comments_count, 1)
+        self.assertEqual(Comment.objects.get(pk=3).created.day, 4)
+        self.assertEqual(Follow.objects.count(), 1)
+        self.assertEqual(UserCounter.objects.get(user=post.author).followers,
+                         1)
+        self.assertEqual([pk for pk, _ in find_posts('Импортированный')],
+                         [7])
+
+    def test_export_import_round_trip(self):
+        """Выгруженные посты загружаются обратно без изменений"""
+
+        author = User.objects.create_user(username='author')
+        Post.objects.create(author=author, text='Первый')
+        Post.objects.create(author=author, text='Второй')
+        expected = list(Post.objects.values_list('pk', 'text', 'pub_date'))
+        path = self.path('posts.csv')
+        call_command('export_posts', 'posts', path, stdout=StringIO())
+        Post.objects.all().delete()
+        call_command('import_posts', 'posts', path, stdout=StringIO())
+        call_command('import_posts', 'posts', path, ignore_conflicts=True,
+                     stdout=StringIO())
+        self.assertEqual(
+            list(Post.objects.values_list('pk', 'text', 'pub_date')),
+            expected)
+
+    @override_settings(FEED_READ_MODEL=True)
+    def test_imported_posts_in_feed(self):
+        """Посты, импортированные с id, попадают в ленты FeedEntry"""
+
+        path = self.write('posts.ndjson', [
+            {'id': 11, 'author': 'writer', 'text': 'Пост из экспорта',
+             'pub_date': '2020-01-02T03:04:05+00:00'},
+        ])
+        call_command('import_posts', 'posts', path, stdout=StringIO())
+        self.assertEqual(FeedEntry.objects.get().pk, 11)
+        response = self.client.get('/')
+        self.assertContains(response, 'Пост из экспорта')
+
+    def test_import_comments_refreshes_cards(self):
+        """После импорта комментариев карточки показывают новое число"""
+
+        author = User.objects.create_user(username='writer')
+        post = Post.objects.create(author=author, text='Пост')
+        self.assertContains(self.client.get('/'), 'Комментариев: 0')
+        path = self.write('comments.ndjson', [
+            {'post': post.pk, 'author': 'reader', 'text': 'Комментарий'},
+        ])
+        call_command('import_posts', 'comments', path, stdout=StringIO())
+        self.assertContains(self.client.get('/'), 'Комментариев: 1')
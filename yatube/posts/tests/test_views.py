@@ -1,17 +1,29 @@
+import os
 import shutil
 import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from io import StringIO
 
 from django.test import Client, TestCase, override_settings
 from django import forms
 from django.conf import settings
 from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from django.core.files.uploadedfile import SimpleUploadedFile
 
 from .test_constants import (COMMENT_TEXT, NUMBER_OF_POSTS,
                              NUMBER_OF_TEST_POSTS, SMALL_GIF)
 
-from ..models import Comment, Follow, Group, Post, User
+from ..models import (Comment, FeedEntry, Follow, Group, Post, User,
+                      UserCounter)
+from .. import benchmarks, timeline
+from ..cards import card_key
+from ..counters import get_counter
+from ..paginators import ELLIPSIS, FeedPaginator, KeysetPaginator
+from ..search import find_posts
 from .test_constants import (CREATE_URL, GROUP_URL,
                              INDEX_URL,
                              PROFILE_URL, USERNAME)
@@ -123,6 +135,34 @@ class PostViewsTest(TestCase):
                 'Паджинатор работает некорректно'
             )
 
+    def test_keyset_paginator(self):
+        """Курсорная пагинация проходит ленту без пропусков и повторов."""
+
+        cursor = KeysetPaginator(
+            Post.objects.all(), NUMBER_OF_POSTS).cursor_for(self.posts[0])
+        seen = [self.posts[0]]
+        pages = []
+        while cursor:
+            response = self.guest_client.get(INDEX_URL, {'cursor': cursor})
+            page_obj = response.context['page_obj']
+            pages.append(page_obj)
+            seen.extend(page_obj)
+            cursor = page_obj.next_cursor
+        self.assertEqual(seen, self.posts)
+        response = self.guest_client.get(
+            INDEX_URL, {'cursor': pages[-1].previous_cursor})
+        self.assertEqual(list(response.context['page_obj']),
+                         list(pages[-2]))
+        self.assertTrue(response.context['page_obj'].has_previous())
+
+    def test_keyset_paginator_broken_cursor(self):
+        """Битый курсор возвращает первую страницу."""
+
+        response = self.guest_client.get(INDEX_URL, {'cursor': 'broken'})
+        self.assertEqual(list(response.context['page_obj']),
+                         self.posts[:NUMBER_OF_POSTS])
+        self.assertFalse(response.context['page_obj'].has_previous())
+
     def test_group_list_context(self):
         """Проверка правильного отображения постов на странице группы."""
 
@@ -290,26 +330,156 @@ class PostViewsTest(TestCase):
         )
 
 
+@override_settings(PAGE_CACHE_ENABLED=True)
 class CacheTest(TestCase):
     @classmethod
     def setUpClass(cls):
         super().setUpClass()
         cls.author = User.objects.create_user(username='Author')
-        cls.post = Post.objects.create(author=cls.author,
+        cls.group = Group.objects.create(title='Группа', slug='group')
+        cls.other_group = Group.objects.create(title='Другая', slug='other')
+        cls.post = Post.objects.create(author=cls.author, group=cls.group,
                                        text='Тестовый пост')
+        cls.other_post = Post.objects.create(
+            author=User.objects.create_user(username='Other'),
+            group=cls.other_group, text='Пост другой группы')
+
+    def setUp(self):
+        cache.clear()
 
     def test_posts_cache(self):
-        """Записи хранятся в течение 20 секунд (кеширование)"""
+        """Страница хранится в кеше до сброса сигналом"""
 
         response = self.client.get(INDEX_URL)
         self.assertContains(response, self.post.text)
-        Post.objects.get(pk=self.post.pk).delete()
+        Post.objects.filter(pk=self.post.pk).update(text='Новый текст')
         response = self.client.get(INDEX_URL)
         self.assertContains(response, self.post.text)
         cache.clear()
         response = self.client.get(INDEX_URL)
         self.assertNotContains(response, self.post.text)
 
+    def test_new_post_purges_pages(self):
+        """Новый пост сбрасывает главную, страницу группы и профиль"""
+
+        urls = (
+            INDEX_URL,
+            reverse('posts:group_list', args=(self.group.slug,)),
+            reverse('posts:profile', args=(self.author,)),
+        )
+        other_url = reverse('posts:group_list', args=(self.other_group.slug,))
+        for url in urls + (other_url,):
+            self.client.get(url)
+        Post.objects.filter(pk=self.other_post.pk).update(text='Изменён')
+        Post.objects.create(author=self.author, group=self.group,
+                            text='Свежий пост')
+        for url in urls:
+            with self.subTest(url=url):
+                self.assertContains(self.client.get(url), 'Свежий пост')
+        self.assertContains(self.client.get(other_url), self.other_post.text)
+
+    def test_comment_purges_post_detail(self):
+        """Комментарий сбрасывает страницу поста"""
+
+        url = reverse('posts:post_detail', args=(self.post.pk,))
+        self.client.get(url)
+        Comment.objects.create(post=self.post, author=self.author,
+                               text=COMMENT_TEXT)
+        self.assertContains(self.client.get(url), COMMENT_TEXT)
+
+    def test_comment_delete_purges_post_detail(self):
+        """Удаление комментария сбрасывает страницу поста и её ETag"""
+
+        comment = Comment.objects.create(post=self.post, author=self.author,
+                                         text=COMMENT_TEXT)
+        url = reverse('posts:post_detail', args=(self.post.pk,))
+        etag = self.client.get(url)['ETag']
+        comment.delete()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotContains(response, COMMENT_TEXT)
+
+    def test_follow_purges_profile(self):
+        """Подписка сбрасывает профили автора и подписчика"""
+
+        url = reverse('posts:profile', args=(self.author,))
+        self.assertEqual(
+            self.client.get(url).context['counter'].followers, 0)
+        reader = User.objects.create_user(username='Reader')
+        Follow.objects.create(user=reader, author=self.author)
+        UserCounter.objects.filter(user=self.author).update(followers=1)
+        self.assertEqual(
+            self.client.get(url).context['counter'].followers, 1)
+
+    def test_authenticated_bypass_cache(self):
+        """Авторизованные пользователи получают свежую страницу"""
+
+        client = Client()
+        client.force_login(self.author)
+        self.client.get(INDEX_URL)
+        Post.objects.filter(pk=self.post.pk).update(text='Новый текст')
+        cache.delete(card_key(self.post.pk, self.post.pub_date))
+        self.assertContains(client.get(INDEX_URL), 'Новый текст')
+        self.assertNotContains(self.client.get(INDEX_URL), 'Новый текст')
+
+
+class ConditionalGetTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='Author')
+        cls.reader = User.objects.create_user(username='Reader')
+        cls.post = Post.objects.create(author=cls.author, text='Пост')
+
+    def setUp(self):
+        cache.clear()
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def assertNotModified(self, client, url):
+        etag = client.get(url)['ETag']
+        self.assertEqual(
+            client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        return etag
+
+    def test_not_modified_until_purged(self):
+        """Страницы отвечают 304, пока их теги не сброшены"""
+
+        urls = (
+            INDEX_URL,
+            reverse('posts:profile', args=(self.author,)),
+            reverse('posts:post_detail', args=(self.post.pk,)),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                etag = self.assertNotModified(self.client, url)
+                self.assertIn('Last-Modified', self.client.get(url))
+                Comment.objects.create(post=self.post, author=self.author,
+                                       text=COMMENT_TEXT)
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 200)
+
+    def test_etag_depends_on_viewer_and_follow_state(self):
+        """ETag различается у зрителей и меняется при подписке"""
+
+        url = reverse('posts:profile', args=(self.author,))
+        etag = self.assertNotModified(self.reader_client, url)
+        self.assertEqual(
+            self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+        self.reader_client.get(
+            reverse('posts:profile_follow', args=(self.author,)))
+        response = self.reader_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.context['following'])
+
+    def test_missing_object_not_conditional(self):
+        """Для несуществующего поста отдаётся 404 без валидаторов"""
+
+        response = self.client.get(
+            reverse('posts:post_detail', args=(self.post.pk + 1,)))
+        self.assertEqual(response.status_code, 404)
+        self.assertFalse(response.has_header('ETag'))
+
 
 class FollowTests(TestCase):
     @classmethod
@@ -339,6 +509,21 @@ class FollowTests(TestCase):
         self.assertFalse(Follow.objects.filter(
             user=self.user1, author=self.author).exists())
 
+    def test_profile_following_state(self):
+        """Профиль автора показывает, подписан ли на него пользователь"""
+
+        Follow.objects.create(user=self.user1, author=self.author)
+        profile_url = reverse('posts:profile', args=(self.author,))
+        clients = {
+            self.follower_client: True,
+            self.unfollower_client: False,
+            Client(): False,
+        }
+        for client, following in clients.items():
+            with self.subTest(following=following):
+                response = client.get(profile_url)
+                self.assertEqual(response.context['following'], following)
+
     def test_follow_index_contains_records(self):
         """Новые записи автора появляются только у подписчиков"""
 
@@ -350,3 +535,478 @@ class FollowTests(TestCase):
                          self.post.pk)
         response = self.unfollower_client.get(reverse('posts:follow_index'))
         self.assertEqual(len(response.context['page_obj']), 0)
+
+
+class TimelineTests(TestCase):
+    BACKENDS = ('posts.timeline.DatabaseTimeline',
+                'posts.timeline.CacheTimeline')
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='Reader')
+        cls.author = User.objects.create_user(username='Author')
+        cls.old_post = Post.objects.create(author=cls.author,
+                                           text='Старый пост')
+
+    def setUp(self):
+        cache.clear()
+        self.reader_client = Client()
+        self.reader_client.force_login(self.user)
+        self.author_client = Client()
+        self.author_client.force_login(self.author)
+
+    def feed(self):
+        response = self.reader_client.get(reverse('posts:follow_index'))
+        return [post.text for post in response.context['page_obj']]
+
+    def test_timeline_fan_out(self):
+        """Лента заполняется при подписке, публикации и чистится при отписке"""
+
+        for backend in self.BACKENDS:
+            with self.subTest(backend=backend), self.settings(
+                    TIMELINE_BACKEND=backend):
+                self.reader_client.get(
+                    reverse('posts:profile_follow', args=(self.author,)))
+                self.assertEqual(self.feed(), ['Старый пост'])
+                self.author_client.post(CREATE_URL, {'text': 'Новый пост'})
+                self.assertEqual(self.feed(), ['Новый пост', 'Старый пост'])
+                self.reader_client.get(
+                    reverse('posts:profile_unfollow', args=(self.author,)))
+                self.assertEqual(self.feed(), [])
+                Post.objects.filter(text='Новый пост').delete()
+
+    @override_settings(TIMELINE_BACKEND='posts.timeline.DatabaseTimeline',
+                       TIMELINE_FANOUT_LIMIT=0)
+    def test_timeline_read_on_demand(self):
+        """Посты популярных авторов читаются при запросе ленты"""
+
+        self.reader_client.get(
+            reverse('posts:profile_follow', args=(self.author,)))
+        self.author_client.post(CREATE_URL, {'text': 'Новый пост'})
+        self.assertFalse(self.user.timeline.filter(
+            post__text='Новый пост').exists())
+        self.assertEqual(self.feed(), ['Новый пост', 'Старый пост'])
+
+    def test_rebuild_existing_follows(self):
+        """Команда rebuild_timelines собирает ленты существующих подписок"""
+
+        Follow.objects.create(user=self.user, author=self.author)
+        for backend in self.BACKENDS:
+            with self.subTest(backend=backend), self.settings(
+                    TIMELINE_BACKEND=backend):
+                call_command('rebuild_timelines', stdout=StringIO())
+                self.assertEqual(self.feed(), ['Старый пост'])
+
+    @override_settings(TIMELINE_BACKEND='posts.timeline.CacheTimeline')
+    def test_cache_timeline_evicted(self):
+        """Вытесненная из кеша лента собирается заново из подписок"""
+
+        self.reader_client.get(
+            reverse('posts:profile_follow', args=(self.author,)))
+        cache.clear()
+        self.author_client.post(CREATE_URL, {'text': 'Новый пост'})
+        self.assertEqual(self.feed(), ['Новый пост', 'Старый пост'])
+
+    @override_settings(TIMELINE_BACKEND='posts.timeline.CacheTimeline')
+    def test_cache_timeline_concurrent_push(self):
+        """Параллельная раздача в общий кеш SQLite не теряет постов"""
+
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        with self.settings(CACHES={'default': {
+                'BACKEND': 'core.cache.SQLiteCache',
+                'LOCATION': os.path.join(directory, 'cache.sqlite3')}}):
+            backend = timeline.CacheTimeline()
+            backend.rebuild(self.user.pk)
+            posts = [Post(pk=number, pub_date=self.old_post.pub_date)
+                     for number in range(1000, 1040)]
+            with ThreadPoolExecutor(max_workers=4) as executor:
+                list(executor.map(
+                    lambda post: backend.push(post, [self.user.pk]), posts))
+            self.assertEqual(sorted(backend.post_ids(self.user)),
+                             [post.pk for post in posts])
+
+    @override_settings(TIMELINE_BACKEND='posts.timeline.DatabaseTimeline',
+                       TIMELINE_MAX_LENGTH=2)
+    def test_database_timeline_trimmed(self):
+        """Лента в таблице не длиннее TIMELINE_MAX_LENGTH"""
+
+        self.reader_client.get(
+            reverse('posts:profile_follow', args=(self.author,)))
+        for number in range(3):
+            self.author_client.post(CREATE_URL, {'text': f'Пост {number}'})
+        self.assertEqual(self.user.timeline.count(), 2)
+        self.assertEqual(self.feed(), ['Пост 2', 'Пост 1'])
+
+
+class SearchTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='Author')
+        cls.post = Post.objects.create(author=cls.author,
+                                       text='Пишем <b>код</b> на Python')
+        Post.objects.create(author=cls.author, text='Другой пост')
+
+    def test_search_index_follows_posts(self):
+        """Индекс поиска обновляется при сохранении и удалении поста"""
+
+        response = self.client.get(INDEX_URL, {'q': 'python'})
+        self.assertEqual(list(response.context['page_obj']), [self.post])
+        self.assertEqual(response.context['text_main'], 'Найдено:')
+        self.assertContains(response, '<mark>Python</mark>')
+        self.assertContains(response, '&lt;b&gt;код&lt;/b&gt;')
+        self.post.delete()
+        response = self.client.get(INDEX_URL, {'q': 'python'})
+        self.assertEqual(len(response.context['page_obj']), 0)
+
+    def test_rebuild_search_index(self):
+        """Команда rebuild_search_index индексирует созданные пакетом посты"""
+
+        Post.objects.bulk_create([Post(author=self.author, text='Пакетный')])
+        self.assertEqual(find_posts('пакетный'), [])
+        call_command('rebuild_search_index', batch_size=1, stdout=StringIO())
+        self.assertEqual(len(find_posts('пакетный')), 1)
+
+
+class CardCacheTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='Author')
+        cls.group = Group.objects.create(title='Группа', slug='group',
+                                         description='Описание')
+        cls.post = Post.objects.create(author=cls.author, group=cls.group,
+                                       text='Тестовый пост')
+
+    def setUp(self):
+        cache.clear()
+        self.key = card_key(self.post.pk, self.post.pub_date)
+
+    def assertCardDropped(self, change):
+        self.client.get(INDEX_URL)
+        self.assertIsNotNone(cache.get(self.key))
+        change()
+        self.assertIsNone(cache.get(self.key))
+
+    def test_card_cached_and_invalidated(self):
+        """Карточка кешируется и сбрасывается при изменении поста,
+        группы и имени автора."""
+
+        self.assertCardDropped(self.post.save)
+        self.group.slug = 'new-group'
+        self.assertCardDropped(self.group.save)
+        self.author.first_name = 'Лев'
+        self.assertCardDropped(self.author.save)
+        response = self.client.get(INDEX_URL)
+        self.assertContains(response, '/group/new-group/')
+
+    def test_card_kept_on_login(self):
+        """Вход автора не сбрасывает кеш его карточек."""
+
+        self.client.get(INDEX_URL)
+        self.client.force_login(self.author)
+        self.assertIsNotNone(cache.get(self.key))
+
+
+class CounterTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='Author')
+        cls.reader = User.objects.create_user(username='Reader')
+        cls.post = Post.objects.create(author=cls.author, text='Пост')
+
+    def setUp(self):
+        self.author_client = Client()
+        self.author_client.force_login(self.author)
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def counter(self, user):
+        return get_counter(User.objects.get(pk=user.pk))
+
+    def test_counters_follow_views(self):
+        """Счётчики обновляются при публикации, комментарии и подписке"""
+
+        self.counter(self.author)
+        self.counter(self.reader)
+        self.author_client.post(CREATE_URL, {'text': 'Новый пост'})
+        self.reader_client.get(
+            reverse('posts:profile_follow', args=(self.author,)))
+        self.reader_client.post(
+            reverse('posts:add_comment', args=(self.post.pk,)),
+            {'text': COMMENT_TEXT})
+        author = self.counter(self.author)
+        self.assertEqual((author.posts, author.followers), (2, 1))
+        self.assertEqual(self.counter(self.reader).following, 1)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comments_count, 1)
+        self.reader_client.get(
+            reverse('posts:profile_unfollow', args=(self.author,)))
+        self.assertEqual(self.counter(self.author).followers, 0)
+
+    def test_counters_follow_deletes(self):
+        """Удаление поста и комментария уменьшает счётчики"""
+
+        self.counter(self.author)
+        for text in ('Второй', 'Третий'):
+            self.author_client.post(CREATE_URL, {'text': text})
+        self.reader_client.post(
+            reverse('posts:add_comment', args=(self.post.pk,)),
+            {'text': COMMENT_TEXT})
+        self.assertContains(self.reader_client.get(INDEX_URL),
+                            'Комментариев: 1')
+        Comment.objects.get().delete()
+        Post.objects.get(text='Второй').delete()
+        self.assertEqual(self.counter(self.author).posts, 2)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comments_count, 0)
+        self.assertEqual(FeedEntry.objects.get(pk=self.post.pk)
+                         .comments_count, 0)
+        self.assertNotContains(self.reader_client.get(INDEX_URL),
+                               'Комментариев: 1')
+
+    def test_counters_follow_orm_writes(self):
+        """Посты и комментарии вне представлений считаются так же"""
+
+        self.counter(self.author)
+        post = Post.objects.create(author=self.author, text='Из shell')
+        Comment.objects.create(post=self.post, author=self.reader, text='К')
+        self.assertEqual(self.counter(self.author).posts, 2)
+        post.delete()
+        self.assertEqual(self.counter(self.author).posts, 1)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comments_count, 1)
+
+    def test_edit_keeps_comments_count(self):
+        """Сохранение поста не затирает счётчик устаревшим значением"""
+
+        stale = Post.objects.get(pk=self.post.pk)
+        Comment.objects.create(post=self.post, author=self.reader, text='К')
+        stale.text = 'Исправленный пост'
+        stale.save()
+        self.author_client.post(
+            reverse('posts:post_update', args=(self.post.pk,)),
+            {'text': 'Ещё раз исправленный'})
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comments_count, 1)
+        self.assertEqual(FeedEntry.objects.get(pk=self.post.pk)
+                         .comments_count, 1)
+
+    def test_counters_created_on_demand(self):
+        """Отсутствующие счётчики считаются по данным"""
+
+        Follow.objects.create(user=self.reader, author=self.author)
+        response = self.reader_client.get(
+            reverse('posts:profile', args=(self.author,)))
+        self.assertEqual(response.context['all_author_posts'], 1)
+        self.assertEqual(response.context['counter'].followers, 1)
+        self.assertTrue(UserCounter.objects.filter(user=self.author).exists())
+
+    def test_reconcile_counters(self):
+        """Команда reconcile_counters исправляет расхождения"""
+
+        Comment.objects.create(post=self.post, author=self.reader, text='К')
+        Follow.objects.create(user=self.reader, author=self.author)
+        UserCounter.objects.create(user=self.author, posts=100)
+        call_command('reconcile_counters', stdout=StringIO())
+        author = UserCounter.objects.get(user=self.author)
+        self.assertEqual((author.posts, author.followers), (1, 1))
+        self.assertEqual(UserCounter.objects.get(user=self.reader).following,
+                         1)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comments_count, 1)
+
+
+class CommentPaginationTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='Author')
+        cls.post = Post.objects.create(author=cls.author, text='Пост')
+        Comment.objects.bulk_create(
+            [Comment(post=cls.post, author=cls.author, text=f'Комментарий {i}')
+             for i in range(25)])
+
+    def test_post_detail_first_comments_page(self):
+        """На странице поста выводится только первая страница комментариев"""
+
+        response = self.client.get(
+            reverse('posts:post_detail', args=(self.post.pk,)))
+        page = response.context['comments_page']
+        self.assertEqual(len(page), 20)
+        self.assertTrue(page.has_next())
+        self.assertContains(response, reverse(
+            'posts:post_comments', args=(self.post.pk,)))
+
+    def test_load_more_comments(self):
+        """Фрагмент с комментариями продолжает список с курсора"""
+
+        response = self.client.get(
+            reverse('posts:post_detail', args=(self.post.pk,)))
+        cursor = response.context['comments_page'].next_cursor
+        response = self.client.get(
+            reverse('posts:post_comments', args=(self.post.pk,)),
+            {'cursor': cursor})
+        page = response.context['comments_page']
+        self.assertEqual(len(page), 5)
+        self.assertFalse(page.has_next())
+        self.assertNotContains(response, '<html')
+        shown = {comment.pk for comment in page}
+        first = {comment.pk for comment in self.client.get(
+            reverse('posts:post_detail', args=(self.post.pk,))
+        ).context['comments_page']}
+        self.assertEqual(len(shown | first), 25)
+
+    def test_comments_fragment_unknown_post(self):
+        """Фрагмент комментариев несуществующего поста — 404"""
+
+        response = self.client.get(reverse('posts:post_comments',
+                                           args=(self.post.pk + 1,)))
+        self.assertEqual(response.status_code, 404)
+
+
+class FeedPaginatorTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='Author')
+        Post.objects.bulk_create(
+            [Post(author=cls.author, text=f'Пост {i}') for i in range(25)])
+
+    def setUp(self):
+        cache.clear()
+
+    def test_elided_page_range(self):
+        """Выводится окно номеров вокруг текущей страницы и края"""
+
+        paginator = FeedPaginator(range(10 ** 6), 10)
+        self.assertEqual(
+            list(paginator.get_elided_page_range(50)),
+            [1, 2, ELLIPSIS, 47, 48, 49, 50, 51, 52, 53, ELLIPSIS,
+             99999, 100000])
+        self.assertEqual(list(FeedPaginator(range(30), 10)
+                              .get_elided_page_range(2)), [1, 2, 3])
+
+    def test_stale_count_keeps_pages_full(self):
+        """Устаревшая оценка не обрезает страницы и уточняется"""
+
+        page = FeedPaginator(Post.objects.order_by('-pk'), 10,
+                             count=3).get_page(2)
+        self.assertEqual(len(page), 10)
+        self.assertTrue(page.has_next())
+        self.assertEqual(page.paginator.num_pages, 3)
+        page = FeedPaginator(Post.objects.order_by('-pk'), 10,
+                             count=100).get_page(9)
+        self.assertEqual((page.number, len(page)), (3, 5))
+        self.assertEqual(page.paginator.count, 25)
+
+    def test_count_cached(self):
+        """COUNT(*) ленты выполняется один раз, а не на каждый запрос"""
+
+        FeedPaginator(Post.objects.order_by('-pk'), 10).get_page(1)
+        with self.assertNumQueries(1):
+            paginator = FeedPaginator(Post.objects.order_by('-pk'), 10)
+            paginator.get_page(1)
+            self.assertEqual(paginator.num_pages, 3)
+
+
+@override_settings(FEED_READ_MODEL=True)
+class FeedReadModelTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(
+            username='Author', first_name='Лев', last_name='Толстой')
+        cls.reader = User.objects.create_user(username='Reader')
+        cls.group = Group.objects.create(title='Группа', slug='group')
+        cls.post = Post.objects.create(author=cls.author, group=cls.group,
+                                       text='Пост ' * 200)
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def test_feeds_read_entries_without_joins(self):
+        """Ленты читают FeedEntry одним запросом без JOIN"""
+
+        urls = {
+            self.client: [INDEX_URL,
+                          reverse('posts:group_list', args=('group',)),
+                          reverse('posts:profile', args=('Author',))],
+            self.reader_client: [reverse('posts:follow_index')],
+        }
+        for client, pages in urls.items():
+            for url in pages:
+                with self.subTest(url=url), CaptureQueriesContext(
+                        connection) as queries:
+                    response = client.get(url)
+                entry = response.context['page_obj'][0]
+                self.assertIsInstance(entry, FeedEntry)
+                self.assertEqual(entry.pk, self.post.pk)
+                feed_sql = [query['sql'] for query in queries
+                            if 'posts_feedentry' in query['sql']]
+                self.assertEqual(len(feed_sql), 1)
+                self.assertNotIn('JOIN', feed_sql[0])
+                self.assertContains(response, 'Лев Толстой')
+                self.assertContains(response, '/group/group/')
+
+    def test_entries_follow_sources(self):
+        """Запись обновляется при правке поста, автора, группы, комментарии"""
+
+        self.group.title = 'Новая группа'
+        self.group.save()
+        self.author.first_name = 'Алексей'
+        self.author.save()
+        self.client.force_login(self.reader)
+        self.client.post(reverse('posts:add_comment', args=(self.post.pk,)),
+                         {'text': 'Комментарий'})
+        entry = FeedEntry.objects.get(pk=self.post.pk)
+        self.assertEqual(
+            (entry.group_title, entry.author_full_name, entry.comments_count),
+            ('Новая группа', 'Алексей Толстой', 1))
+        self.assertLessEqual(len(entry.excerpt),
+                             settings.FEED_EXCERPT_LENGTH)
+        self.group.delete()
+        entry.refresh_from_db()
+        self.assertEqual((entry.group_id, entry.group_slug), (None, ''))
+
+    def test_rebuild_feed(self):
+        """rebuild_feed добавляет посты, созданные пакетом без сигналов"""
+
+        Post.objects.bulk_create([Post(author=self.author, text='Пакетный')])
+        self.assertEqual(FeedEntry.objects.count(), 1)
+        call_command('rebuild_feed', stdout=StringIO())
+        self.assertEqual(FeedEntry.objects.count(), 2)
+
+
+class BenchmarkTests(TestCase):
+    def test_seed_and_run(self):
+        """Синтетические данные создаются, замеры сравниваются с базой"""
+
+        benchmarks.seed(users=5, posts=20, groups=2, follows=2, comments=10)
+        self.assertEqual(Post.objects.count(), 20)
+        self.assertEqual(Comment.objects.count(), 10)
+        results = benchmarks.run(requests=2, warmup=0, routes=['index'])
+        self.assertEqual(results['index']['status'], 200)
+        self.assertEqual(benchmarks.compare(results, results, 0.2), [])
+        slower = {'index': dict(results['index'], p95=1e6, queries=100)}
+        self.assertEqual(len(benchmarks.compare(slower, results, 0.2)), 2)
+
+    def test_mutating_routes_skipped(self):
+        """Подписка, отписка и формы записи не замеряются"""
+
+        benchmarks.seed(users=5, posts=20, groups=2, follows=2, comments=10)
+        follows = Follow.objects.count()
+        urls = benchmarks.route_urls()
+        self.assertIn('index', urls)
+        self.assertFalse(set(benchmarks.MUTATING_ROUTES) & set(urls))
+        author = benchmarks.route_kwargs()['username']
+        follower = Follow.objects.filter(author__username=author).first()
+        benchmarks.run(requests=1, warmup=0,
+                       username=follower.user.username)
+        self.assertEqual(Follow.objects.count(), follows)
@@ -0,0 +1,68 @@
+from django.conf import settings
+from django.core.files.storage import default_storage
+from sorl.thumbnail import get_thumbnail
+from sorl.thumbnail.base import ThumbnailBackend
+
+from core.metrics import timed
+from core.tasks import task
+from . import cards, feed, images
+from .models import FeedEntry, Post
+
+
+class TimedThumbnailBackend(ThumbnailBackend):
+    """Бэкенд sorl, замеряющий получение миниатюр для метрики thumbnail."""
+
+    def get_thumbnail(self, file_, geometry_string, **options):
+        with timed('thumbnail'):
+            return super().get_thumbnail(file_, geometry_string, **options)
+
+
+def largest_size():
+    """Ширина и высота самой большой миниатюры из POST_THUMBNAILS."""
+    geometry, _ = settings.POST_THUMBNAILS[-1]
+    width, height = geometry.split('x')
+    return int(width), int(height)
+
+
+def renditions(image):
+    """Адрес самой большой миниатюры и srcset всех из POST_THUMBNAILS.
+
+    Опции должны совпадать с теми, что использует {% responsive_image %},
+    иначе sorl построит другой ключ и картинка будет пересчитана.
+    """
+    thumbnails = [get_thumbnail(image, geometry, **options)
+                  for geometry, options in settings.POST_THUMBNAILS]
+    srcset = ', '.join(f'{thumbnail.url} {thumbnail.width}w'
+                       for thumbnail in thumbnails)
+    return thumbnails[-1].url, srcset
+
+
+def fill_placeholder(name):
+    """Заглушка для постов с картинкой name, загруженных без неё."""
+    posts = Post.objects.filter(image=name, placeholder='')
+    stale = list(posts.values_list('pk', 'pub_date'))
+    if not stale:
+        return
+    with default_storage.open(name) as file:
+        placeholder = images.placeholder(file)
+    posts.update(placeholder=placeholder)
+    FeedEntry.objects.filter(image=name).update(placeholder=placeholder)
+    cards.invalidate(stale)
+
+
+@task()
+def generate(name):
+    """Создаёт миниатюры всех размеров из POST_THUMBNAILS для файла name.
+
+    Адреса попадают в карточки FeedEntry. Постам, загруженным до
+    появления заглушек, она создаётся здесь же, поэтому команда
+    generate_thumbnails заполняет и их.
+    """
+    feed.set_thumbnail(name, *renditions(name))
+    fill_placeholder(name)
+
+
+def schedule(post):
+    """Ставит создание миниатюр картинки поста в очередь задач."""
+    if post.image:
+        generate.delay(post.image.name)
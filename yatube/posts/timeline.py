@@ -0,0 +1,227 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Q
+from django.utils.module_loading import import_string
+
+from core.tasks import task
+from .counters import get_counter
+from .models import Follow, Post, TimelineEntry, User
+
+
+def followed_posts(user_id):
+    """(pub_date, id) последних постов авторов, на которых подписан user."""
+    return (Post.objects.filter(author_id__in=Follow.objects.filter(
+        user_id=user_id).values('author_id'))
+        .order_by('-pub_date')
+        .values_list('pub_date', 'pk')[:settings.TIMELINE_MAX_LENGTH])
+
+
+class DatabaseTimeline:
+    """Лента подписок, материализованная в таблице TimelineEntry."""
+
+    def push(self, post, user_ids):
+        TimelineEntry.objects.bulk_create(
+            [TimelineEntry(user_id=user_id, post_id=post.pk,
+                           pub_date=post.pub_date)
+             for user_id in user_ids],
+            ignore_conflicts=True,
+        )
+        self.trim(user_ids)
+
+    def trim(self, user_ids):
+        """Оставляет TIMELINE_MAX_LENGTH последних записей каждой ленты.
+
+        Удаление идёт только для лент, которые одним запросом признаны
+        переполненными.
+        """
+        limit = settings.TIMELINE_MAX_LENGTH
+        overflowing = (TimelineEntry.objects.filter(user_id__in=user_ids)
+                       .order_by().values('user_id')
+                       .annotate(total=Count('pk')).filter(total__gt=limit)
+                       .values_list('user_id', flat=True))
+        for user_id in overflowing:
+            stale = (TimelineEntry.objects.filter(user_id=user_id)
+                     .order_by('-pub_date')
+                     .values_list('pk', flat=True)[limit:])
+            TimelineEntry.objects.filter(pk__in=list(stale)).delete()
+
+    def backfill(self, user, author):
+        posts = author.posts.values_list('pk', 'pub_date')
+        TimelineEntry.objects.bulk_create(
+            [TimelineEntry(user=user, post_id=pk, pub_date=pub_date)
+             for pk, pub_date in posts[:settings.TIMELINE_MAX_LENGTH]],
+            ignore_conflicts=True,
+        )
+        self.trim([user.pk])
+
+    def rebuild(self, user_id):
+        TimelineEntry.objects.filter(user_id=user_id).delete()
+        TimelineEntry.objects.bulk_create(
+            [TimelineEntry(user_id=user_id, post_id=pk, pub_date=pub_date)
+             for pub_date, pk in followed_posts(user_id)])
+
+    def prune(self, user, author):
+        TimelineEntry.objects.filter(user=user, post__author=author).delete()
+
+    def post_ids(self, user):
+        return TimelineEntry.objects.filter(user=user).values('post_id')
+
+
+class CacheTimeline:
+    """Лента подписок в кеше: список (pub_date, id) последних постов.
+
+    Кеш может вытеснить ключ, поэтому промах означает не пустую ленту,
+    а ленту, которую нужно собрать заново из Follow (rebuild).
+
+    Кеш с update_many (core.cache.SQLiteCache) меняет ленты одной
+    транзакцией, и несколько воркеров run_tasks не теряют записей.
+    С другими бэкендами чтение и запись не атомарны: задачи лент
+    должен выполнять один воркер.
+    """
+
+    def key(self, user_id):
+        return f'timeline:{user_id}'
+
+    def _store(self, user_id, entries):
+        entries = sorted(set(entries), reverse=True)
+        cache.set(self.key(user_id), entries[:settings.TIMELINE_MAX_LENGTH],
+                  timeout=None)
+
+    def _update(self, user_ids, change):
+        """Применяет change к лентам из кеша; возвращает изменённые ключи.
+
+        Ленты, которых нет в кеше, пропускаются.
+        """
+        limit = settings.TIMELINE_MAX_LENGTH
+
+        def update(entries):
+            return sorted(set(change(entries)), reverse=True)[:limit]
+        keys = [self.key(user_id) for user_id in user_ids]
+        update_many = getattr(cache, 'update_many', None)
+        if update_many is not None:
+            return update_many(keys, update)
+        stored = cache.get_many(keys)
+        cache.set_many({key: update(entries)
+                        for key, entries in stored.items()}, timeout=None)
+        return list(stored)
+
+    def push(self, post, user_ids):
+        entry = (post.pub_date, post.pk)
+        self._update(user_ids, lambda entries: entries + [entry])
+
+    def backfill(self, user, author):
+        posts = list(author.posts.values_list(
+            'pub_date', 'pk')[:settings.TIMELINE_MAX_LENGTH])
+        if not self._update([user.pk], lambda entries: entries + posts):
+            self.rebuild(user.pk)
+
+    def prune(self, user, author):
+        author_posts = set(author.posts.values_list('pk', flat=True))
+        self._update([user.pk], lambda entries: [
+            entry for entry in entries if entry[1] not in author_posts])
+
+    def rebuild(self, user_id):
+        entries = list(followed_posts(user_id))
+        self._store(user_id, entries)
+        return entries
+
+    def post_ids(self, user):
+        entries = cache.get(self.key(user.pk))
+        if entries is None:
+            entries = self.rebuild(user.pk)
+        return [pk for _, pk in entries]
+
+
+def get_timeline():
+    if not settings.TIMELINE_BACKEND:
+        return None
+    return import_string(settings.TIMELINE_BACKEND)()
+
+
+def rebuild(batch_size=1000):
+    """Собирает ленты всех подписчиков из Follow и Post.
+
+    Нужна после включения TIMELINE_BACKEND на существующей базе и после
+    пакетной загрузки, которая обходит раздачу по лентам.
+    """
+    timeline = get_timeline()
+    if timeline is None:
+        return 0
+    user_ids = (Follow.objects.order_by('user_id')
+                .values_list('user_id', flat=True).distinct())
+    total = 0
+    for user_id in user_ids.iterator(chunk_size=batch_size):
+        timeline.rebuild(user_id)
+        total += 1
+    return total
+
+
+def read_on_demand_authors(user):
+    """Авторы, чьи посты не раздаются по лентам, а читаются при запросе."""
+    return Follow.objects.filter(
+        user=user,
+        author__counter__followers__gt=settings.TIMELINE_FANOUT_LIMIT,
+    ).values_list('author_id', flat=True)
+
+
+def fan_out(post):
+    timeline = get_timeline()
+    if timeline is None:
+        return
+    if get_counter(post.author).followers > settings.TIMELINE_FANOUT_LIMIT:
+        return
+    followers = Follow.objects.filter(
+        author_id=post.author_id).values_list('user_id', flat=True)
+    timeline.push(post, list(followers))
+
+
+def follow(user, author):
+    timeline = get_timeline()
+    if timeline is not None:
+        timeline.backfill(user, author)
+
+
+@task(priority=10)
+def fan_out_post(post_id):
+    post = Post.objects.select_related('author').filter(pk=post_id).first()
+    if post is not None:
+        fan_out(post)
+
+
+@task(priority=10)
+def backfill(user_id, author_id):
+    """Заполняет ленту, если подписка ещё действует к моменту запуска."""
+    if Follow.objects.filter(user_id=user_id, author_id=author_id).exists():
+        users = User.objects.in_bulk([user_id, author_id])
+        follow(users[user_id], users[author_id])
+
+
+def schedule_fan_out(post):
+    if settings.TIMELINE_BACKEND:
+        fan_out_post.delay(post.pk)
+
+
+def schedule_follow(user, author):
+    if settings.TIMELINE_BACKEND:
+        backfill.delay(user.pk, author.pk)
+
+
+def unfollow(user, author):
+    timeline = get_timeline()
+    if timeline is not None:
+        timeline.prune(user, author)
+
+
+def follow_feed(user, posts=None):
+    """Лента подписок из posts: постов или записей FeedEntry."""
+    if posts is None:
+        posts = Post.objects.select_related('author', 'group')
+    timeline = get_timeline()
+    if timeline is None:
+        return posts.filter(author_id__in=Follow.objects.filter(
+            user=user).values('author_id'))
+    query = Q(pk__in=timeline.post_ids(user))
+    on_demand = list(read_on_demand_authors(user))
+    if on_demand:
+        query |= Q(author_id__in=on_demand)
+    return posts.filter(query)
@@ -0,0 +1,254 @@
+import csv
+import json
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage, default_storage
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from core.utils import batched
+from . import cards, counters, feed, pagecache, search, timeline
+from .models import Comment, FeedEntry, Follow, Group, Post, User
+
+UPLOAD_DIR = 'posts'
+# Имена ContentAddressedStorage: posts/ab/cd/<sha256>.<ext>.
+CONTENT_NAME = re.compile(
+    rf'^{UPLOAD_DIR}/[0-9a-f]{{2}}/[0-9a-f]{{2}}/[0-9a-f]{{64}}')
+FIELDS = {
+    'posts': ('id', 'author', 'group', 'text', 'pub_date', 'image'),
+    'comments': ('id', 'post', 'author', 'text', 'created'),
+    'follows': ('user', 'author'),
+}
+EXPORT_QUERIES = {
+    'posts': (Post, {'author': 'author__username', 'group': 'group__slug'}),
+    'comments': (Comment, {'post': 'post_id', 'author': 'author__username'}),
+    'follows': (Follow, {'user': 'user__username',
+                         'author': 'author__username'}),
+}
+
+
+def guess_format(path):
+    return 'csv' if path.endswith('.csv') else 'ndjson'
+
+
+def read_rows(file, file_format):
+    """Построчно читает записи NDJSON или CSV, не загружая файл целиком."""
+    if file_format == 'csv':
+        yield from csv.DictReader(file)
+        return
+    for line in file:
+        if line.strip():
+            yield json.loads(line)
+
+
+def write_rows(file, file_format, fields, rows):
+    if file_format == 'csv':
+        writer = csv.DictWriter(file, fields)
+        writer.writeheader()
+    total = 0
+    for row in rows:
+        if file_format == 'csv':
+            writer.writerow(row)
+        else:
+            file.write(json.dumps(row, ensure_ascii=False, default=str))
+            file.write('\n')
+        total += 1
+    return total
+
+
+def export_rows(kind, batch_size):
+    model, lookups = EXPORT_QUERIES[kind]
+    fields = FIELDS[kind]
+    names = [lookups.get(field, field) for field in fields]
+    rows = model.objects.order_by('pk').values_list(*names)
+    for values in rows.iterator(chunk_size=batch_size):
+        row = dict(zip(fields, values))
+        for field in ('pub_date', 'created'):
+            if row.get(field):
+                row[field] = row[field].isoformat()
+        yield row
+
+
+def parse_date(value):
+    if not value:
+        return timezone.now()
+    value = parse_datetime(value)
+    if timezone.is_naive(value):
+        value = timezone.make_aware(value, timezone.utc)
+    return value
+
+
+@contextmanager
+def keep_dates(model, field):
+    """Отключает auto_now_add: bulk_create сохраняет даты из файла."""
+    field = model._meta.get_field(field)
+    auto_now_add, field.auto_now_add = field.auto_now_add, False
+    try:
+        yield
+    finally:
+        field.auto_now_add = auto_now_add
+
+
+def resolve(model, lookup, values, defaults):
+    """{значение: pk}; недостающие объекты создаются одним bulk_create."""
+    values = set(filter(None, values))
+    found = dict(model.objects.filter(**{f'{lookup}__in': values})
+                 .values_list(lookup, 'pk'))
+    missing = values - found.keys()
+    if missing:
+        model.objects.bulk_create(
+            [model(**{lookup: value}, **defaults(value)) for value in missing],
+            ignore_conflicts=True,
+        )
+        found.update(model.objects.filter(**{f'{lookup}__in': missing})
+                     .values_list(lookup, 'pk'))
+    return found
+
+
+def resolve_users(usernames):
+    return resolve(User, 'username', usernames,
+                   lambda username: {'password': '!'})
+
+
+def resolve_groups(slugs):
+    return resolve(Group, 'slug', slugs,
+                   lambda slug: {'title': slug, 'description': ''})
+
+
+def copy_image(source_root, name):
+    """Копирует картинку в MEDIA_ROOT/posts/; возвращает имя в хранилище."""
+    if not name:
+        return ''
+    with open(os.path.join(source_root, name), 'rb') as file:
+        return default_storage.save(
+            f'{UPLOAD_DIR}/{os.path.basename(name)}', File(file))
+
+
+class Importer:
+    """Потоковый импорт пакетами: память не зависит от размера файла.
+
+    Авторы и группы ищутся по username и slug и создаются при
+    необходимости; id постов и комментариев сохраняются, поэтому
+    комментарии ссылаются на посты из того же экспорта.
+    """
+
+    def __init__(self, batch_size=1000, media_root=None, workers=8,
+                 ignore_conflicts=False):
+        self.batch_size = batch_size
+        self.media_root = media_root
+        self.workers = workers
+        self.ignore_conflicts = ignore_conflicts
+        self.reindex = False
+
+    def run(self, kind, rows):
+        load = getattr(self, f'load_{kind}')
+        total = 0
+        with ThreadPoolExecutor(self.workers) as self.pool:
+            for batch in batched(rows, self.batch_size):
+                with transaction.atomic():
+                    load(batch)
+                total += len(batch)
+        if self.reindex:
+            search.get_backend().rebuild(self.batch_size)
+            feed.rebuild(self.batch_size)
+        counters.reconcile()
+        if kind in ('posts', 'follows'):
+            timeline.rebuild(self.batch_size)
+        pagecache.purge(pagecache.SITE_TAG)
+        return total
+
+    def load_posts(self, batch):
+        authors = resolve_users(row['author'] for row in batch)
+        groups = resolve_groups(row.get('group') for row in batch)
+        images = [''] * len(batch)
+        if self.media_root:
+            images = self.pool.map(
+                lambda row: copy_image(self.media_root, row.get('image')),
+                batch)
+        posts = [
+            Post(pk=row.get('id') or None, author_id=authors[row['author']],
+                 group_id=groups.get(row.get('group')), text=row['text'],
+                 pub_date=parse_date(row.get('pub_date')), image=image)
+            for row, image in zip(batch, images)
+        ]
+        with keep_dates(Post, 'pub_date'):
+            Post.objects.bulk_create(
+                posts, ignore_conflicts=self.ignore_conflicts)
+        if all(post.pk for post in posts):
+            post_ids = [post.pk for post in posts]
+            search.get_backend().index_many(post_ids)
+            feed.add_posts(post_ids)
+        else:
+            # Без id SQLite не возвращает pk из bulk_create.
+            self.reindex = True
+
+    def load_comments(self, batch):
+        authors = resolve_users(row['author'] for row in batch)
+        comments = [
+            Comment(pk=row.get('id') or None, post_id=row['post'],
+                    author_id=authors[row['author']], text=row['text'],
+                    created=parse_date(row.get('created')))
+            for row in batch
+        ]
+        with keep_dates(Comment, 'created'):
+            Comment.objects.bulk_create(
+                comments, ignore_conflicts=self.ignore_conflicts)
+
+    def load_follows(self, batch):
+        users = resolve_users([row['user'] for row in batch]
+                              + [row['author'] for row in batch])
+        Follow.objects.bulk_create(
+            [Follow(user_id=users[row['user']],
+                    author_id=users[row['author']])
+             for row in batch if row['user'] != row['author']],
+            ignore_conflicts=True,
+        )
+
+
+def migrate_images(storage, workers=8, batch_size=1000, delete=False):
+    """Переносит картинки постов из плоского posts/ в storage.
+
+    Имена обходятся по ключу пакетами; файлы пакета копируются пулом
+    потоков, затем посты с каждым старым именем получают новое одним
+    UPDATE. При delete старый файл удаляется после фиксации транзакции.
+    Возвращает (число файлов, число постов).
+    """
+    source = FileSystemStorage(location=storage.location)
+    names = (Post.objects.exclude(image='').order_by('image')
+             .values_list('image', flat=True).distinct())
+
+    def move(name):
+        if not source.exists(name):
+            return None
+        with source.open(name) as file:
+            return storage.save(name, file)
+
+    files = posts = 0
+    last = ''
+    with ThreadPoolExecutor(workers) as pool:
+        while True:
+            batch = list(names.filter(image__gt=last)[:batch_size])
+            if not batch:
+                break
+            last = batch[-1]
+            batch = [name for name in batch if not CONTENT_NAME.match(name)]
+            moved = {old: new for old, new in zip(batch, pool.map(move, batch))
+                     if new and new != old}
+            with transaction.atomic():
+                for old, new in moved.items():
+                    cards.invalidate(Post.objects.filter(image=old)
+                                     .values_list('pk', 'pub_date'))
+                    posts += Post.objects.filter(image=old).update(image=new)
+                    FeedEntry.objects.filter(image=old).update(
+                        image=new, thumbnail_url='', thumbnail_srcset='')
+            files += len(moved)
+            if delete:
+                for old in moved:
+                    source.delete(old)
+    pagecache.purge(pagecache.SITE_TAG)
+    return files, posts
@@ -1,50 +1,89 @@
 from http.client import HTTPResponse
 
+from django.conf import settings
 from django.contrib.auth.decorators import login_required
-from django.core.paginator import Paginator
+from django.db.models import Exists, OuterRef
 from django.shortcuts import get_object_or_404, redirect, render
 from django.views.decorators.http import require_GET
 
+from . import (counters, notifications, pagecache, search, thumbnails,
+               timeline)
 from .forms import CommentForm, PostForm
-from .models import Comment, Follow, Group, Post, User
+from .models import Comment, FeedEntry, Follow, Group, Post, User
+from .paginators import FeedPaginator, KeysetPaginator
 
 NUMBER_OF_POSTS = 10
+NUMBER_OF_COMMENTS = 20
+PAGE_NUMBER_LIMIT = 5
 
 
-def paginator_func(request, posts):
-    paginator = Paginator(posts, NUMBER_OF_POSTS)
+def posts_feed():
+    """Общий queryset лент: HTML-страницы и JSON API."""
+    return Post.objects.select_related('author', 'group')
+
+
+def feed_source():
+    """Лента HTML-страниц: записи FeedEntry без JOIN или посты."""
+    if settings.FEED_READ_MODEL:
+        return FeedEntry.objects.all()
+    return posts_feed()
+
+
+def paginator_func(request, posts, count=None):
+    cursor = request.GET.get('cursor')
+    if cursor:
+        return KeysetPaginator(posts, NUMBER_OF_POSTS).get_page(cursor)
+    paginator = FeedPaginator(posts, NUMBER_OF_POSTS, count=count)
     page_number = request.GET.get('page')
     page_obj = paginator.get_page(page_number)
+    if page_obj.number >= PAGE_NUMBER_LIMIT and page_obj.has_next():
+        page_obj.next_cursor = KeysetPaginator(
+            posts, NUMBER_OF_POSTS).cursor_for(page_obj[-1])
     return page_obj
 
 
+def comments_page_func(request, comments):
+    return KeysetPaginator(comments, NUMBER_OF_COMMENTS,
+                           field='created').get_page(
+        request.GET.get('cursor'))
+
+
 @require_GET
+@pagecache.conditional(pagecache.index_tags)
+@pagecache.cache_for_anonymous
 def index(request):
-    posts = Post.objects.select_related('author', 'group')
+    pagecache.tag(request, 'index')
+    posts = feed_source()
     text_main = 'Последние обновления на сайте'
     template = 'posts/index.html'
     keyword = request.GET.get("q", None)
     if keyword:
-        posts = Post.objects.select_related('author', 'group').filter(
-            text__icontains=keyword)
-        if posts:
+        hits = search.find_posts(keyword)
+        if hits:
             text_main = 'Найдено:'
-            posts = Post.objects.select_related('author', 'group').filter(
-                text__icontains=keyword)
         else:
             text_main = 'По Вашему запросу ничего не найдено'
+        page_obj = FeedPaginator(hits, NUMBER_OF_POSTS).get_page(
+            request.GET.get('page'))
+        page_obj.object_list = search.load_posts(page_obj.object_list)
+    else:
+        page_obj = paginator_func(request, posts)
     context = {
         'text_main': text_main,
-        'page_obj': paginator_func(request, posts),
+        'keyword': keyword,
+        'page_obj': page_obj,
     }
     return render(request, template, context)
 
 
+@pagecache.conditional(pagecache.group_tags)
+@pagecache.cache_for_anonymous
 def group_posts(request, slug):
     group = get_object_or_404(Group, slug=slug)
+    pagecache.tag(request, f'group:{group.pk}')
     template = 'posts/group_list.html'
     text_groups = f'Записи сообщества "{group.title}"'
-    posts = group.posts.select_related('author', 'group')
+    posts = feed_source().filter(group=group)
     context = {
         'text_groups': text_groups,
         'group': group,
@@ -53,44 +92,67 @@ def group_posts(request, slug):
     return render(request, template, context)
 
 
+@pagecache.conditional(pagecache.profile_tags)
+@pagecache.cache_for_anonymous
 def profile(request, username):
-    author_name = get_object_or_404(User, username=username)
+    authors = User.objects.select_related('counter')
+    if request.user.is_authenticated:
+        authors = authors.annotate(is_followed=Exists(
+            Follow.objects.filter(user=request.user, author=OuterRef('pk'))))
+    author_name = get_object_or_404(authors, username=username)
     if author_name:
-        posts = Post.objects.select_related('author',
-                                            'group').filter(author=author_name)
-        all_author_posts = author_name.posts.count()
-        if (request.user.is_authenticated
-            and Follow.objects.filter(user=request.user,
-                                      author=author_name).exists()):
-            following = True
-        else:
-            following = False
+        pagecache.tag(request, f'author:{author_name.pk}')
+        posts = feed_source().filter(author=author_name)
+        counter = counters.get_counter(author_name)
+        all_author_posts = counter.posts
+        following = getattr(author_name, 'is_followed', False)
         context = {
             'author_name': author_name,
             'all_author_posts': all_author_posts,
-            'page_obj': paginator_func(request, posts),
+            'counter': counter,
+            'page_obj': paginator_func(request, posts, all_author_posts),
             'following': following
         }
         return render(request, 'posts/profile.html', context)
     return HTTPResponse('Ничего не найдено по запросу о данном авторе.')
 
 
+@pagecache.conditional(pagecache.post_tags)
+@pagecache.cache_for_anonymous
 def post_detail(request, post_id):
-    post = get_object_or_404(Post.objects.select_related(), pk=post_id)
-    all_author_posts = post.author.posts.count()
+    post = get_object_or_404(
+        Post.objects.select_related('author__counter', 'group'), pk=post_id)
+    pagecache.tag(request, f'post:{post.pk}', f'author:{post.author_id}')
+    all_author_posts = counters.get_counter(post.author).posts
     title_30 = post.text[:30]
     form = CommentForm()
-    comments = post.comments.all()
+    comments = post.comments.select_related('author')
     context = {
         'all_author_posts': all_author_posts,
         'title_30': title_30,
         'post': post,
         'form': form,
-        'comments': comments
+        'comments': comments,
+        'comments_page': comments_page_func(request, comments),
     }
     return render(request, 'posts/post_detail.html', context)
 
 
+@require_GET
+@pagecache.conditional(pagecache.post_tags)
+@pagecache.cache_for_anonymous
+def post_comments(request, post_id):
+    """HTML-фрагмент со следующей страницей комментариев."""
+    post = get_object_or_404(Post.objects.only('pk'), pk=post_id)
+    pagecache.tag(request, f'post:{post.pk}')
+    comments = post.comments.select_related('author')
+    context = {
+        'post': post,
+        'comments_page': comments_page_func(request, comments),
+    }
+    return render(request, 'includes/comments.html', context)
+
+
 @login_required
 def post_create(request):
     form = PostForm(request.POST or None, files=request.FILES or None,)
@@ -100,6 +162,9 @@ def post_create(request):
     new_post = form.save(commit=False)
     new_post.author_id = request.user.id
     new_post.save()
+    thumbnails.schedule(new_post)
+    notifications.schedule(new_post)
+    timeline.schedule_fan_out(new_post)
     return redirect('posts:profile', request.user)
 
 
@@ -134,6 +199,8 @@ def post_edit(request, post_id):
         }
         return render(request, 'posts/create_post.html', context)
     form.save()
+    if 'image' in form.changed_data:
+        thumbnails.schedule(post)
     return redirect('posts:post_detail', post_id)
 
 
@@ -152,7 +219,7 @@ def add_comment(request, post_id):
 
 @login_required
 def follow_index(request):
-    follow_list = Post.objects.filter(author__following__user=request.user)
+    follow_list = timeline.follow_feed(request.user, feed_source())
     page_obj = paginator_func(request, follow_list)
     follow = True
     context = {'follow': follow,
@@ -164,19 +231,24 @@ def follow_index(request):
 @login_required
 def profile_follow(request, username):
     author = get_object_or_404(User, username=username)
-    if (request.user != author
-            and not Follow.objects.filter(user=request.user,
-                                          author=author).exists()):
-        Follow.objects.create(user=request.user,
-                              author=author)
+    if request.user == author:
+        return redirect('posts:profile', author)
+    _, created = Follow.objects.get_or_create(user=request.user,
+                                              author=author)
+    if created:
+        counters.change(author.pk, 'followers')
+        counters.change(request.user.pk, 'following')
+        timeline.schedule_follow(request.user, author)
     return redirect('posts:profile', author)
 
 
 @login_required
 def profile_unfollow(request, username):
     author = get_object_or_404(User, username=username)
-    if Follow.objects.filter(user=request.user,
-                             author=author):
-        Follow.objects.filter(user=request.user,
-                              author=author).delete()
+    deleted, _ = Follow.objects.filter(user=request.user,
+                                       author=author).delete()
+    if deleted:
+        counters.change(author.pk, 'followers', -1)
+        counters.change(request.user.pk, 'following', -1)
+        timeline.unfollow(request.user, author)
     return redirect('posts:profile', author)
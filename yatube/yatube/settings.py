@@ -12,6 +12,8 @@ https://docs.djangoproject.com/en/2.2/ref/settings/
 
 import os
 
+from django.core.exceptions import ImproperlyConfigured
+
 # Build paths inside the project like this: os.path.join(BASE_DIR, ...)
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 MEDIA_URL = '/media/'
@@ -28,11 +30,25 @@ WORKS_WELL = 200
 # Quick-start development settings - unsuitable for production
 # See https://docs.djangoproject.com/en/2.2/howto/deployment/checklist/
 
+# Профиль production включается переменной окружения
+# YATUBE_PROFILE=production: DEBUG выключен, debug_toolbar не
+# импортируется, шаблоны кешируются (Django включает cached.Loader
+# сам, когда DEBUG выключен), соединения с БД переиспользуются,
+# статика собирается с хешами и сжатыми копиями, картинки постов
+# хранятся под хешем содержимого.
+PRODUCTION = os.environ.get('YATUBE_PROFILE') == 'production'
+
 # SECURITY WARNING: keep the secret key used in production secret!
-SECRET_KEY = 'vk3w@c0uy_%h(kx+ax+_!)&2wia!r@9a&=()qouajh_2u_&vtm'
+# Ключ из репозитория допустим только в разработке.
+SECRET_KEY = os.environ.get('YATUBE_SECRET_KEY')
+if not SECRET_KEY:
+    if PRODUCTION:
+        raise ImproperlyConfigured(
+            'Профиль production требует переменную YATUBE_SECRET_KEY.')
+    SECRET_KEY = 'vk3w@c0uy_%h(kx+ax+_!)&2wia!r@9a&=()qouajh_2u_&vtm'
 
 # SECURITY WARNING: don't run with debug turned on in production!
-DEBUG = True
+DEBUG = not PRODUCTION
 
 ALLOWED_HOSTS = [
     'localhost',
@@ -43,7 +59,9 @@ ALLOWED_HOSTS = [
     'ehite05.pythonanywhere.com',
 ]
 
-STATICFILES_DIRS = [os.path.join(BASE_DIR, 'static')]
+STATICFILES_DIRS = [
+    path for path in [os.path.join(BASE_DIR, 'static')] if os.path.isdir(path)
+]
 
 # Application definition
 
@@ -58,10 +76,13 @@ INSTALLED_APPS = [
     'users.apps.UsersConfig',
     'core.apps.CoreConfig',
     'sorl.thumbnail',
-    'debug_toolbar',
 ]
+if DEBUG:
+    INSTALLED_APPS.append('debug_toolbar')
 
 MIDDLEWARE = [
+    'core.middleware.MetricsMiddleware',
+    'core.middleware.QueryBudgetMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -69,14 +90,15 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
-    'debug_toolbar.middleware.DebugToolbarMiddleware',
 ]
+if DEBUG:
+    MIDDLEWARE.append('debug_toolbar.middleware.DebugToolbarMiddleware')
 
 ROOT_URLCONF = 'yatube.urls'
 TEMPLATES_DIR = os.path.join(BASE_DIR, 'templates')
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'core.metrics.TimedTemplates',
         'DIRS': [TEMPLATES_DIR],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -101,6 +123,8 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+        'CONN_MAX_AGE': int(os.environ.get('YATUBE_CONN_MAX_AGE', 600))
+        if PRODUCTION else 0,
     }
 }
 
@@ -142,13 +166,122 @@ USE_TZ = True
 # https://docs.djangoproject.com/en/2.2/howto/static-files/
 
 STATIC_URL = '/static/'
-
+STATIC_ROOT = os.environ.get('YATUBE_STATIC_ROOT',
+                             os.path.join(BASE_DIR, 'staticfiles'))
+if PRODUCTION:
+    STATICFILES_STORAGE = 'core.storage.CompressedManifestStaticFilesStorage'
+    # Картинки постов по хешу содержимого; миниатюры sorl уже
+    # разложены по хешу и пишутся в обычное хранилище.
+    DEFAULT_FILE_STORAGE = 'core.storage.ContentAddressedStorage'
+    THUMBNAIL_STORAGE = 'django.core.files.storage.FileSystemStorage'
+
+# В DEBUG кеш локален для процесса; иначе все воркеры хоста делят
+# общий кеш в файле SQLite (core.cache.SQLiteCache) с вытеснением LRU.
 CACHES = {
     'default': {
         'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    } if DEBUG else {
+        'BACKEND': 'core.cache.SQLiteCache',
+        'LOCATION': os.environ.get('YATUBE_CACHE_PATH',
+                                   os.path.join(BASE_DIR, 'cache.sqlite3')),
+        'OPTIONS': {'MAX_ENTRIES': 100_000},
     }
 }
 
 INTERNAL_IPS = [
     '127.0.0.1',
 ]
+
+# Материализованная лента подписок: None отключает её,
+# 'posts.timeline.DatabaseTimeline' или 'posts.timeline.CacheTimeline'.
+# После включения на существующей базе ленты собирает rebuild_timelines.
+# CacheTimeline с несколькими воркерами run_tasks требует кеша
+# core.cache.SQLiteCache, с остальными кешами нужен один воркер.
+TIMELINE_BACKEND = None
+TIMELINE_FANOUT_LIMIT = 1000
+TIMELINE_MAX_LENGTH = 800
+
+# Поиск по постам: None выбирает FTS5 на SQLite и LIKE на остальных БД.
+SEARCH_BACKEND = None
+SEARCH_RESULTS_LIMIT = 1000
+
+# Кеш отрендеренных карточек постов; версию повышают при смене шаблона.
+POST_CARD_VERSION = 2
+POST_CARD_TIMEOUT = 24 * 60 * 60
+
+# Миниатюры, которые создаются фоновой задачей после загрузки картинки,
+# по возрастанию ширины: тег {% responsive_image %} отдаёт их в srcset,
+# а самую большую — в src. Заглушка POST_PLACEHOLDER_SIZE тех же
+# пропорций встраивается в страницу, пока миниатюра не загрузилась.
+POST_THUMBNAILS = [
+    ('320x113', {'crop': 'center', 'upscale': True}),
+    ('640x226', {'crop': 'center', 'upscale': True}),
+    ('960x339', {'crop': 'center', 'upscale': True}),
+]
+POST_PLACEHOLDER_SIZE = (28, 10)
+POST_PLACEHOLDER_QUALITY = 50
+
+# Бюджет SQL-запросов на ответ и поиск N+1 (core.middleware).
+# QUERY_BUDGETS задаёт бюджет отдельных маршрутов по имени 'app:view';
+# повтор одного отпечатка запроса QUERY_N_PLUS_ONE_THRESHOLD раз — N+1.
+QUERY_BUDGET_ENABLED = DEBUG
+QUERY_BUDGET_RAISE = False
+QUERY_BUDGET_DEFAULT = 10
+QUERY_BUDGETS = {}
+QUERY_N_PLUS_ONE_THRESHOLD = 5
+
+# Кеш страниц для анонимных посетителей (posts.pagecache).
+# Сбрасывается сигналами, поэтому время жизни записи велико.
+# В режиме DEBUG выключен, чтобы правки шаблонов были видны сразу.
+PAGE_CACHE_ENABLED = not DEBUG
+PAGE_CACHE_TIMEOUT = 24 * 60 * 60
+
+# Фоновые задачи (core.tasks), выполняет команда run_tasks.
+# В режиме DEBUG задачи выполняются сразу, без очереди и воркера.
+TASKS_EAGER = DEBUG
+TASK_MAX_ATTEMPTS = 3
+TASK_RETRY_DELAY = 10
+TASK_STALE_TIMEOUT = 10 * 60
+# Выполненные задачи удаляются воркером при запуске и командой
+# run_tasks --prune; задачи с ошибкой хранятся до ручной очистки.
+TASK_RETENTION_DAYS = 7
+
+# Дайджесты подписчикам о новых постах (posts.notifications).
+# Уведомления копятся NOTIFICATION_DIGEST_DELAY секунд и уходят одним
+# письмом на пользователя, по одному соединению на пакет писем.
+NOTIFICATION_DIGEST_DELAY = 15 * 60
+NOTIFICATION_BATCH_SIZE = 1000
+NOTIFICATION_SITE_URL = 'http://127.0.0.1:8000'
+
+# Замеры ответов (core.middleware.MetricsMiddleware): заголовок
+# Server-Timing и гистограммы маршрутов из METRICS_NAMESPACES по адресу
+# /metrics/ для Prometheus. Процесс сбрасывает гистограммы в общий кеш
+# раз в METRICS_FLUSH_INTERVAL секунд. Адрес открывается только
+# с токеном: Prometheus передаёт его как bearer_token.
+METRICS_ENABLED = True
+METRICS_NAMESPACES = ['posts']
+METRICS_FLUSH_INTERVAL = 10
+METRICS_TOKEN = os.environ.get('YATUBE_METRICS_TOKEN', '')
+THUMBNAIL_BACKEND = 'posts.thumbnails.TimedThumbnailBackend'
+
+# Число постов в лентах для номеров страниц (posts.paginators) берётся
+# из кеша и пересчитывается не чаще раза в FEED_COUNT_TIMEOUT секунд.
+FEED_COUNT_TIMEOUT = 5 * 60
+
+# Ленты из денормализованной таблицы FeedEntry (posts.feed): один запрос
+# без JOIN. Таблица синхронизируется всегда, настройка меняет только
+# чтение; в режиме DEBUG ленты читаются из Post, как раньше.
+FEED_READ_MODEL = not DEBUG
+FEED_EXCERPT_LENGTH = 500
+
+# Картинки постов при загрузке (posts.images): файл пишется на диск, а не
+# в память; слишком большие отклоняются по заголовку, остальные
+# уменьшаются до IMAGE_MAX_SIDE и сохраняются без EXIF в WebP, если
+# Pillow его поддерживает, иначе в JPEG. GIF не перекодируются.
+FILE_UPLOAD_HANDLERS = [
+    'django.core.files.uploadhandler.TemporaryFileUploadHandler',
+]
+IMAGE_MAX_UPLOAD_SIZE = 20 * 1024 * 1024
+IMAGE_MAX_PIXELS = 50_000_000
+IMAGE_MAX_SIDE = 2048
+IMAGE_QUALITY = 82